@@ -0,0 +1,237 @@
+from internals.general_utils import generateClusterOfIstances, parseOptions
+from internals.solver_utils import columns
+from internals.solver import solveProblem
+from internals.instance_store import store
+from internals.lp_backend import BACKENDS
+from internals.profiling import enable_profiling, profile_summary
+from internals.tracing import set_trace_level
+from configparser import ConfigParser
+import numpy as np
+import platform
+import datetime
+import tempfile
+import shutil
+import json
+import sys
+import os
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+# Phases of the resolution timed separately
+PHASES = ["parse", "mip", "root_lp", "tableau", "separation", "resolve", "io"]
+# The spans of solveProblem timed by each phase, with the spans nested in them (see phaseOf)
+PHASE_SPANS = [("instance/parse", "parse"), ("instance/mip", "mip"), ("instance/build", "root_lp"),
+               ("instance/round/solve", "root_lp"), ("instance/round/separation", "separation"),
+               ("instance/round/resolve", "resolve")]
+# Version of the instance generator: the instances of the tiers are generated again when it changes
+GENERATOR_VERSION = 3
+
+def generateTier(tier, settings):
+    '''
+    This function generates (once) the instances of a tier, always the same ones for the same settings:
+    like a cluster of config.ini, the shapes and the seeds of the instances come from the seed of the tier.
+
+    Arguments:
+        tier -- the tier name
+        settings -- its section of benchmarks.ini
+    returns:
+        paths -- the instance files
+    '''
+    path_name = os.path.join(BENCHMARK_DIR, "instances", tier)
+    num_instances = settings.getint('NUM_INSTANCES')
+    seed = settings.getint('SEED')
+    cluster = settings.get('CLUSTER')
+    config = store.get_config()
+    if cluster is not None:
+        var_range = [int(config[cluster]['MIN_N_VAR']), int(config[cluster]['MAX_N_VAR'])]
+        constr_range = [int(config[cluster]['MIN_COSTRAINTS']), int(config[cluster]['MAX_COSTRAINTS'])]
+        coefficients_range = [int(config[cluster]['MIN_COEFF_VAL']), int(config[cluster]['MAX_COEFF_VAL'])]
+    else:
+        var_range = [settings.getint('N_VAR')] * 2
+        constr_range = [settings.getint('N_CONSTRAINTS')] * 2
+        coefficients_range = [settings.getint('MIN_COEFF_VAL'), settings.getint('MAX_COEFF_VAL')]
+    # The instances are generated again only if the settings of the tier change
+    signature = json.dumps({"generator": GENERATOR_VERSION, "seed": seed, "instances": num_instances, "variables": var_range,
+                            "constraints": constr_range, "coefficients": coefficients_range})
+    signature_path = os.path.join(path_name, "signature.json")
+    current = None
+    if os.path.exists(signature_path):
+        with open(signature_path) as file:
+            current = file.read()
+    if current != signature:
+        if os.path.exists(path_name):
+            shutil.rmtree(path_name)
+        generateClusterOfIstances(num_instances, var_range, constr_range, tier, seed, 0,
+                                  {"path_name": path_name, "coefficients_range": coefficients_range})
+        with open(signature_path, "w") as file:
+            file.write(signature)
+    return [os.path.join(path_name, "inst_"+str(k)+".txt") for k in range(num_instances)]
+
+def phaseOf(path):
+    '''
+    This function tells the phase a span of solveProblem belongs to: the artifact snapshots are io and
+    the tableau reads are tableau wherever they happen, the other spans belong to the phase of the first
+    span of PHASE_SPANS they are nested in (None = not timed, e.g. the bookkeeping of the rounds).
+    '''
+    parts = path.split("/")
+    if "snapshot" in parts:
+        return "io"
+    if "tableau" in parts:
+        return "tableau"
+    for prefix, phase in PHASE_SPANS:
+        if path == prefix or path.startswith(prefix+"/"):
+            return phase
+    return None
+
+def benchmarkInstance(path, cluster_type, workdir):
+    '''
+    This function solves an instance with solveProblem, the spans being recorded, and times each
+    phase from them (the self time of every span goes to the phase of phaseOf).
+
+    Arguments:
+        path -- the instance file (absolute)
+        cluster_type -- the section of config.ini with the settings of the resolution
+        workdir -- the working directory of the resolution (artifacts and logs)
+    returns:
+        timings -- dictionary phase -> milliseconds
+        rounds_done, bound -- the rounds actually done and the final LP bound
+    '''
+    timings = dict.fromkeys(PHASES, 0.0)
+    # The instance is parsed again at every run
+    store.clear()
+    enable_profiling(True)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        stats = solveProblem(path, cluster_type, workdir)
+    finally:
+        os.chdir(cwd)
+    for row in profile_summary():
+        phase = phaseOf(row["path"])
+        if phase is not None:
+            timings[phase] += row["self_ms"]
+    enable_profiling(False)
+    rounds_done = max(row[columns.index("iterations")] for row in stats)
+    return timings, rounds_done, stats[-1][columns.index("sol")]
+
+def benchmarkTier(tier, settings, backend):
+    '''
+    This function runs a tier REPEAT times, at most ROUNDS Gomory rounds for each instance.
+
+    returns:
+        result -- dictionary with the median, min and max of every phase over the runs (each run
+                  being the sum over the instances), the runs themselves and the rounds and bounds
+    '''
+    paths = generateTier(tier, settings)
+    # Every run solves the instances from scratch (no optimal cache and no sidecar), with the time budget of the tier
+    for key, value in [("LP_BACKEND", backend), ("MAX_ROUNDS", settings.get('ROUNDS')),
+                       ("MAX_TIME_PER_INSTANCE", settings.get('MAX_TIME')),
+                       ("OPTIMAL_CACHE", "no"), ("INSTANCE_CACHE", "no")]:
+        store.override(key, value)
+    cluster_type = settings.get('CLUSTER', 'DEFAULT')
+    runs = []
+    workdir = tempfile.mkdtemp(prefix="benchmark_")
+    try:
+        for _ in range(settings.getint('REPEAT')):
+            run = dict.fromkeys(PHASES, 0.0)
+            rounds, bounds = [], []
+            for path in paths:
+                timings, rounds_done, bound = benchmarkInstance(path, cluster_type, workdir)
+                for phase in PHASES:
+                    run[phase] += timings[phase]
+                rounds.append(rounds_done)
+                bounds.append(bound)
+            run["total"] = sum(run[phase] for phase in PHASES)
+            runs.append(run)
+    finally:
+        shutil.rmtree(workdir)
+    phases = {}
+    for phase in PHASES+["total"]:
+        values = [run[phase] for run in runs]
+        phases[phase] = {"median": round(float(np.median(values)), 3), "min": round(min(values), 3),
+                         "max": round(max(values), 3), "runs": [round(value, 3) for value in values]}
+    return {"instances": len(paths), "rounds": rounds, "bounds": bounds, "phases": phases}
+
+def compareBaseline(results, baseline, threshold, min_ms):
+    '''
+    This function compares the phase medians of the results with the ones of a baseline.
+
+    Arguments:
+        results, baseline -- benchmark results (see benchmarkTier)
+        threshold -- relative slowdown reported as a regression (e.g. 0.25 = 25% slower)
+        min_ms -- the phases faster than this in the baseline are not compared
+    returns:
+        regressions -- list of (tier, phase, baseline ms, new ms)
+    '''
+    regressions = []
+    print("\n%-18s %-11s %12s %12s %8s" % ("tier", "phase", "baseline ms", "new ms", "ratio"))
+    for tier, result in results["tiers"].items():
+        if tier not in baseline["tiers"]:
+            continue
+        for phase, stats in result["phases"].items():
+            old = baseline["tiers"][tier]["phases"].get(phase)
+            if old is None or old["median"] < min_ms:
+                continue
+            ratio = stats["median"] / old["median"]
+            flag = ""
+            if ratio > 1 + threshold:
+                regressions.append((tier, phase, old["median"], stats["median"]))
+                flag = "  <-- regression"
+            print("%-18s %-11s %12.3f %12.3f %8.2f%s" % (tier, phase, old["median"], stats["median"], ratio, flag))
+    return regressions
+
+def invalidInput():
+    print("Invalid input.\nUsage (from the main root):\n"
+    +"\t--> python -m benchmarks.benchmark [options]\n"
+    +"Options:\n\t-tiers t1,t2 --> the tiers of benchmarks.ini to run (default: all)\n"
+    +"\t-backend cplex|numpy --> the LP backend (default: LP_BACKEND in config.ini)\n"
+    +"\t-repeat N --> the runs of each tier (default: REPEAT in benchmarks.ini)\n"
+    +"\t-out file.json --> where the results are written (default: benchmarks/results.json)\n"
+    +"\t-baseline file.json --> the baseline to compare with (default: benchmarks/baseline.json, if it exists)\n"
+    +"\t-threshold T --> the relative slowdown reported as a regression (default: THRESHOLD in benchmarks.ini)\n"
+    +"\t-save file.json --> also save the results as the new baseline\n")
+    sys.exit(-1)
+
+if __name__ == '__main__':
+    options, argv = parseOptions(sys.argv, ["-tiers", "-backend", "-repeat", "-out", "-baseline", "-threshold", "-save"])
+    if len(argv) != 1:
+        invalidInput()
+    tiers_config = ConfigParser()
+    tiers_config.read(os.path.join(BENCHMARK_DIR, "benchmarks.ini"))
+    config = store.get_config()
+    backend = options.get("-backend", config['DEFAULT'].get('LP_BACKEND', 'cplex'))
+    tiers = options["-tiers"].split(",") if "-tiers" in options else tiers_config.sections()
+    if backend not in BACKENDS or any(tier not in tiers_config.sections() for tier in tiers):
+        invalidInput()
+    try:
+        threshold = float(options.get("-threshold", tiers_config['DEFAULT'].getfloat('THRESHOLD')))
+        if "-repeat" in options:
+            for tier in tiers:
+                tiers_config[tier]['REPEAT'] = str(int(options["-repeat"]))
+    except ValueError:
+        invalidInput()
+    set_trace_level("off")
+
+    results = {"created": datetime.datetime.now().isoformat(timespec="seconds"), "backend": backend,
+               "python": platform.python_version(), "machine": platform.platform(), "tiers": {}}
+    for tier in tiers:
+        print("Benchmarking tier '"+tier+"'...")
+        results["tiers"][tier] = benchmarkTier(tier, tiers_config[tier], backend)
+        phases = results["tiers"][tier]["phases"]
+        print("\t"+", ".join(phase+" "+str(phases[phase]["median"])+" ms" for phase in PHASES+["total"]))
+    out = options.get("-out", os.path.join(BENCHMARK_DIR, "results.json"))
+    with open(out, "w") as file:
+        json.dump(results, file, indent=1)
+    print("Results written to", out)
+
+    regressions = []
+    baseline_path = options.get("-baseline", os.path.join(BENCHMARK_DIR, "baseline.json"))
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as file:
+            baseline = json.load(file)
+        regressions = compareBaseline(results, baseline, threshold, tiers_config['DEFAULT'].getfloat('MIN_MS'))
+        print("\n"+str(len(regressions))+" regressions (threshold "+str(threshold)+") against", baseline_path)
+    if "-save" in options:
+        with open(options["-save"], "w") as file:
+            json.dump(results, file, indent=1)
+        print("Baseline saved to", options["-save"])
+    sys.exit(1 if regressions else 0)
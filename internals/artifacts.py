@@ -0,0 +1,138 @@
+from internals.profiling import span
+import threading
+import logging
+import shutil
+import queue
+import gzip
+import os
+
+# Artifact policies, each one writes everything the previous ones write
+NONE = "none"       # no .lp/.log artifact at all
+FINAL = "final"     # only the MIP model and the final model of each instance
+ROUND = "round"     # the model at the end of every Gomory round
+CUT = "cut"         # the model after every solve
+
+POLICIES = [NONE, FINAL, ROUND, CUT]
+
+class StagedFile:
+    '''
+    This class is an artifact already written by the solver in a staging file (e.g. by the .write()
+    of CPLEX), which the writer thread moves to its destination.
+
+    Attributes:
+        path -- the staging file
+    '''
+    def __init__(self, path):
+        self.path = path
+
+class ArtifactWriter:
+    '''
+    This class writes the .lp/.log artifacts of an instance from a background thread.
+    The LP backend is only queried by the solving thread, which takes a snapshot of the model and of
+    its solution (as text, or as StagedFile): compression and disk writes happen on the writer thread,
+    out of the timed loop.
+
+    Attributes:
+        policy -- one of POLICIES
+        compress -- gzip the artifacts
+        budget -- maximum number of bytes written for the instance (0 = unlimited)
+        written -- number of bytes written so far
+        dropped -- number of artifacts not written because of the budget or of an error
+        snapshot_time -- milliseconds spent by the solving thread taking the snapshots
+    '''
+    def __init__(self, policy=ROUND, compress=False, budget=0):
+        if policy not in POLICIES:
+            raise ValueError("Unknown artifact policy '"+str(policy)+"', expected one of: "+", ".join(POLICIES))
+        self.policy = policy
+        self.compress = compress
+        self.budget = budget
+        self.written = 0
+        self.dropped = 0
+        self.snapshot_time = 0.0
+        self._queue = queue.Queue()
+        self._thread = None
+        if policy != NONE:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def enabled(self, kind):
+        '''
+        This function tells whether the artifacts of the given kind (final, round or cut) are written.
+        '''
+        return POLICIES.index(self.policy) >= POLICIES.index(kind)
+
+    def write_model(self, kind, snapshot, lp_path, log_path):
+        '''
+        This function takes a snapshot of the model and of its solution and queues them for writing.
+
+        Arguments:
+            kind -- final, round or cut
+            snapshot -- function returning the model (LP format) and its solution, as strings or
+                        StagedFile, e.g. the artifacts() of an LPBackend already solved
+            lp_path, log_path -- the destination files
+        '''
+        if not self.enabled(kind):
+            return
+        with span("snapshot", kind=kind) as snapshot_span:
+            lp, log = snapshot()
+        self.snapshot_time += snapshot_span.wall_ms
+        self._queue.put((lp_path, lp))
+        self._queue.put((log_path, log))
+
+    def close(self):
+        '''
+        This function waits until every queued artifact has been written and stops the thread.
+        '''
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        if self.dropped > 0:
+            logging.info("%d artifacts not written (budget of %d bytes)", self.dropped, self.budget)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            path, artifact = item
+            if self.compress:
+                path = path+".gz"
+            try:
+                if isinstance(artifact, StagedFile):
+                    self._move(artifact.path, path)
+                else:
+                    self._write(artifact.encode(), path)
+            except OSError as e:
+                logging.info("Cannot write artifact '%s': %s", path, e)
+                self.dropped += 1
+
+    def _fits(self, size):
+        if self.budget > 0 and self.written+size > self.budget:
+            self.dropped += 1
+            return False
+        return True
+
+    def _write(self, data, path):
+        if self.compress:
+            data = gzip.compress(data, compresslevel=5)
+        if self._fits(len(data)):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as file:
+                file.write(data)
+            self.written += len(data)
+
+    def _move(self, staged, path):
+        # The staging file is always removed, also when the artifact is dropped
+        try:
+            size = os.path.getsize(staged)
+            if self.compress:
+                with open(staged, "rb") as file:
+                    self._write(file.read(), path)
+            elif self._fits(size):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                shutil.move(staged, path)
+                self.written += size
+        finally:
+            if os.path.exists(staged):
+                os.remove(staged)
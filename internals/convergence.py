@@ -0,0 +1,88 @@
+import math
+
+class ConvergenceMonitor:
+    '''
+    This class follows the LP bound of an instance round after round and detects the tailing off of the
+    Gomory rounds: the bound (an upper bound, decreasing) has improved by less than epsilon, relatively,
+    over the last window rounds, or by less than rate (relative improvement per second) over the time of
+    those rounds. It also adapts the number of cuts of the next round to the gain of the last one: more
+    cuts while they still move the bound, fewer when they do not.
+
+    Attributes:
+        window -- number of rounds of the sliding window (0 = never tailing off)
+        epsilon -- minimum relative improvement of the bound over the window
+        rate -- minimum relative improvement per second over the window (0 = not checked)
+        min_cuts, max_cuts -- range of the adaptive number of cuts per round
+        grow, shrink -- factors applied to the number of cuts per round after a round with and without gain
+        trajectory -- list of (milliseconds, bound, cuts) of every round, round 0 included
+    '''
+    def __init__(self, window=0, epsilon=0.0, rate=0.0, min_cuts=1, max_cuts=0, grow=2.0, shrink=0.5):
+        self.window = window
+        self.epsilon = epsilon
+        self.rate = rate
+        self.min_cuts = max(min_cuts, 1)
+        self.max_cuts = max_cuts
+        self.grow = grow
+        self.shrink = shrink
+        self.trajectory = []
+        self._restart = 0
+
+    def update(self, elapsed, bound, cuts=0):
+        '''
+        This function records the end of a round.
+
+        Arguments:
+            elapsed -- the milliseconds of the resolution so far
+            bound -- the LP bound at the end of the round
+            cuts -- the cuts added in the round
+        '''
+        self.trajectory.append((elapsed, bound, cuts))
+
+    def improvement(self, rounds=1):
+        '''
+        returns:
+            improvement -- relative decrease of the bound over the last rounds (0 if not enough rounds)
+        '''
+        if len(self.trajectory) <= rounds:
+            return 0.0
+        old, new = self.trajectory[-rounds-1][1], self.trajectory[-1][1]
+        return (old-new) / max(abs(old), 1e-9)
+
+    def tailing_off(self):
+        '''
+        This function tells whether the bound has stalled over the window (only once window rounds
+        have been done since the start or the last restart).
+        '''
+        if self.window <= 0 or len(self.trajectory)-1-self._restart < self.window:
+            return False
+        improvement = self.improvement(self.window)
+        if improvement < self.epsilon:
+            return True
+        if self.rate > 0:
+            seconds = (self.trajectory[-1][0]-self.trajectory[-self.window-1][0]) / 1000
+            return seconds > 0 and improvement / seconds < self.rate
+        return False
+
+    def restart(self):
+        '''
+        This function starts a new window (e.g. after a change of separation strategy).
+        '''
+        self._restart = len(self.trajectory)-1
+
+    def next_cuts(self, cuts):
+        '''
+        This function adapts the number of cuts of the next round.
+
+        Arguments:
+            cuts -- the number of cuts per round used so far (0 = all the violated ones, never adapted)
+        returns:
+            cuts -- the number of cuts of the next round, grown when the last round improved the bound
+                    by at least epsilon and shrunk otherwise, within [min_cuts, max_cuts]
+        '''
+        if cuts <= 0 or len(self.trajectory) < 2:
+            return cuts
+        factor = self.grow if self.improvement(1) >= self.epsilon else self.shrink
+        cuts = int(math.ceil(cuts * factor)) if factor > 1 else int(cuts * factor)
+        if self.max_cuts > 0:
+            cuts = min(cuts, self.max_cuts)
+        return max(cuts, self.min_cuts)
@@ -0,0 +1,162 @@
+import numpy as np
+import hashlib
+
+# Decimals kept when hashing a normalized cut
+KEY_DECIMALS = 9
+# A cut is binding when its slack is below this value
+BINDING_TOL = 1e-6
+
+class Cut:
+    '''
+    This class is a cut of the pool: coefs x <= limit.
+
+    Attributes:
+        key -- see cut_key
+        coefs, limit -- the cut
+        age -- consecutive rounds the cut has been useless (non binding in the LP, or not selected)
+    '''
+    def __init__(self, key, coefs, limit):
+        self.key = key
+        self.coefs = coefs
+        self.limit = limit
+        self.age = 0
+
+def cut_key(coefs, limit):
+    '''
+    This function computes the hash of a cut normalized by its largest coefficient,
+    so that the same cut generated twice (or scaled) gets the same key.
+    '''
+    row = np.append(coefs, limit)
+    scale = np.max(np.abs(row))
+    if scale > 0:
+        row = row / scale
+    # + 0.0 turns -0.0 into 0.0
+    return hashlib.blake2b((np.round(row, KEY_DECIMALS) + 0.0).tobytes(), digest_size=16).digest()
+
+class CutPool:
+    '''
+    This class is the pool of the Gomory cuts of an instance. The generated cuts are stored
+    once (duplicates are dropped by hash), and every round only the best k of them go to the LP:
+    the most efficacious ones (distance of the LP solution from the cut) that are not nearly parallel
+    to the ones already chosen. A cut that stays non binding in the LP for max_age rounds is
+    removed from the LP and goes back to the pool; a candidate that is not selected for max_age
+    rounds is dropped.
+
+    Attributes:
+        n_rows -- number of rows of the model that are not cuts (the cuts follow them in the LP)
+        max_age -- see above (0 = the cuts are never removed)
+        max_parallelism -- maximum cosine between two cuts selected in the same round (1 = no limit)
+        min_efficacy -- minimum efficacy of a selected cut
+        candidates -- the cuts of the pool that are not in the LP
+        active -- the cuts in the LP, in the order of their rows
+        duplicates, purged, dropped -- counters of the duplicate cuts, of the cuts removed from
+                                       the LP and of the candidates dropped
+    '''
+    def __init__(self, n_rows, max_age=0, max_parallelism=1.0, min_efficacy=0.0):
+        self.n_rows = n_rows
+        self.max_age = max_age
+        self.max_parallelism = max_parallelism
+        self.min_efficacy = min_efficacy
+        self.candidates = []
+        self.active = []
+        self.duplicates = 0
+        self.purged = 0
+        self.dropped = 0
+        self._keys = set()
+
+    def __len__(self):
+        return len(self.candidates) + len(self.active)
+
+    def add(self, cuts, limits):
+        '''
+        This function adds the new cuts to the candidates, dropping the ones already in the pool or in the LP.
+
+        returns:
+            added -- the number of new cuts
+        '''
+        added = 0
+        for coefs, limit in zip(cuts, limits):
+            key = cut_key(coefs, limit)
+            if key in self._keys:
+                self.duplicates += 1
+                continue
+            self._keys.add(key)
+            self.candidates.append(Cut(key, coefs, limit))
+            added += 1
+        return added
+
+    def select(self, x, k=0):
+        '''
+        This function chooses the cuts to add to the LP and moves them to the active cuts.
+
+        Arguments:
+            x -- the LP solution (problem variables only)
+            k -- maximum number of cuts (0 = all the violated ones)
+        returns:
+            cuts, limits -- the selected cuts, by decreasing efficacy (shape = k * n, 1 * k)
+        '''
+        if len(self.candidates) == 0:
+            return np.zeros((0, len(x))), np.zeros(0)
+        C = np.array([cut.coefs for cut in self.candidates])
+        limits = np.array([cut.limit for cut in self.candidates])
+        norms = np.linalg.norm(C, axis=1)
+        efficacy = np.where(norms > 0, (C @ x - limits) / np.where(norms > 0, norms, 1), -np.inf)
+        chosen = []
+        for i in np.argsort(-efficacy, kind="stable"):
+            if efficacy[i] <= self.min_efficacy or (k > 0 and len(chosen) >= k):
+                break
+            if chosen and self.max_parallelism < 1:
+                cosines = np.abs(C[chosen] @ C[i]) / (norms[chosen] * norms[i])
+                if cosines.max() > self.max_parallelism:
+                    continue
+            chosen.append(i)
+        selected = set(chosen)
+        remaining = []
+        for i, cut in enumerate(self.candidates):
+            if i in selected:
+                continue
+            cut.age += 1
+            if self.max_age > 0 and cut.age > self.max_age:
+                self._keys.discard(cut.key)
+                self.dropped += 1
+            else:
+                remaining.append(cut)
+        for i in chosen:
+            self.candidates[i].age = 0
+            self.active.append(self.candidates[i])
+        self.candidates = remaining
+        return C[chosen], limits[chosen]
+
+    def unselect(self, n):
+        '''
+        This function moves the last n selected cuts back to the candidates (e.g. the ones that were
+        not added to the LP because the round was stopped).
+        '''
+        if n <= 0:
+            return
+        self.candidates += self.active[-n:]
+        del self.active[-n:]
+
+    def purge(self, slacks):
+        '''
+        This function ages the active cuts and removes from them the ones that have been non binding
+        for max_age rounds (they go back to the candidates).
+
+        Arguments:
+            slacks -- the values of the slacks of the cut rows, in the order of the rows
+        returns:
+            rows -- the indexes of the LP rows to remove
+        '''
+        rows = []
+        active = []
+        for i, (cut, slack) in enumerate(zip(self.active, slacks)):
+            cut.age = cut.age + 1 if slack > BINDING_TOL else 0
+            if self.max_age > 0 and cut.age >= self.max_age:
+                rows.append(self.n_rows+i)
+                cut.age = 0
+                self.candidates.append(cut)
+            else:
+                active.append(cut)
+        self.active = active
+        self.purged += len(rows)
+        return rows
@@ -0,0 +1,55 @@
+import math
+import time
+
+# Smallest time limit given to a solver, so that an expired deadline still ends with a solve that stops at once
+MIN_TIME_LIMIT = 1
+
+# Statuses of a solve stopped by its time limit (CPLEX names, also used by the numpy backend)
+TIME_LIMIT_STATUSES = ["abort_time_lim", "MIP_time_limit_feasible", "MIP_time_limit_infeasible"]
+
+class Deadline:
+    '''
+    This class is the wall clock time budget of an instance, started when it is created.
+    Every solve gets the remaining time as its time limit (see time_limit), and the Gomory rounds
+    check expired() between their blocks of cuts.
+
+    Attributes:
+        budget -- the budget in milliseconds (0 = no deadline)
+        reached -- True once expired() has found the deadline over, i.e. something was stopped by it
+    '''
+    def __init__(self, budget=0):
+        self.budget = budget
+        self.reached = False
+        self._start = time.monotonic()
+
+    def elapsed_ms(self):
+        return (time.monotonic()-self._start) * 1000
+
+    def remaining_ms(self):
+        '''
+        returns:
+            remaining -- the milliseconds left (math.inf without a deadline, 0 once expired)
+        '''
+        if self.budget <= 0:
+            return math.inf
+        return max(self.budget-self.elapsed_ms(), 0.0)
+
+    def expired(self):
+        if self.remaining_ms() <= 0:
+            self.reached = True
+        return self.reached
+
+    def time_limit(self, cap=0):
+        '''
+        This function computes the time limit of the next solve.
+
+        Arguments:
+            cap -- the time limit of the solve without a deadline (milliseconds, 0 = none)
+        returns:
+            time_limit -- the smallest of cap and of the remaining time, in milliseconds (0 = none)
+        '''
+        remaining = self.remaining_ms()
+        if remaining == math.inf:
+            return cap
+        limit = max(remaining, MIN_TIME_LIMIT)
+        return min(limit, cap) if cap > 0 else limit
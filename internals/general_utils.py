@@ -1,19 +1,26 @@
-from configparser import ConfigParser
 from datetime import datetime
+import multiprocessing
+import functools
 import logging
-import random
 import pandas as pd
+import io
 import sys
 import os
 import math
 import numpy as np
 import shutil
 from scipy.stats import pearsonr
+from internals.instance_store import store
+from internals.solver_utils import save_sidecar, SIDECAR_VERSION
 
 
+# With GENERATION_JOBS = 0, the clusters with fewer constraint coefficients than this are generated
+# serially: below about half a second of generation, starting the processes costs more than it saves
+PARALLEL_GENERATION_MIN_COEFFICIENTS = 1000000
+
 logging.basicConfig(filename='resolution.log', format='%(asctime)s - %(message)s',level=logging.INFO, datefmt='%d-%b-%y %H:%M:%S')
 
-def getStatistics(name,cluster_type,nVar,nConstraints,optimal_sol,sol,sol_type,status,ncuts, elapsed_time, iterations):
+def getStatistics(name,cluster_type,nVar,nConstraints,optimal_sol,sol,sol_type,status,ncuts, elapsed_time, iterations, build_time=0.0, solve_time=0.0, stop_reason=""):
     stats = []
     stats.append(name)
     stats.append(cluster_type)
@@ -34,8 +41,16 @@ def getStatistics(name,cluster_type,nVar,nConstraints,optimal_sol,sol,sol_type,s
         else:
             stats.append(modulus(sol,optimal_sol)/(optimal_sol+pow(10,-10)))
     stats.append(iterations)
+    stats.append(round(build_time,3))
+    stats.append(round(solve_time,3))
+    stats.append(stop_reason)
     return stats
 
+def relativeGap(sol, optimal_sol):
+    if optimal_sol == 0:
+        return 1
+    return modulus(sol,optimal_sol)/(optimal_sol+pow(10,-10))
+
 def modulus(x, y):
     if x >= y:
         result = x - y
@@ -45,9 +60,8 @@ def modulus(x, y):
 
 def generateIstances(cluster_type)  :
     columns = ["corr","name"]
-    # Read config file
-    config = ConfigParser()
-    config.read('config.ini')
+    # Read config file (once, the workers get all the parameters)
+    config = store.get_config()
     if not os.path.exists("correlations"):
         os.makedirs("correlations")
     # Get a list of all Clusters 
@@ -56,92 +70,108 @@ def generateIstances(cluster_type)  :
             var_range=[int(config[cluster]['MIN_N_VAR']),int(config[cluster]['MAX_N_VAR'])]
             constr_range=[int(config[cluster]['MIN_COSTRAINTS']),int(config[cluster]['MAX_COSTRAINTS'])]
             num_instances=int(config[cluster]['NUM_ISTANCES'])
-            df_list = generateClusterOfIstances(num_instances, var_range, constr_range, cluster)
+            seed = config[cluster].getint('GENERATION_SEED', fallback=None)
+            params = {"coefficients_range": [int(config[cluster]['MIN_COEFF_VAL']),int(config[cluster]['MAX_COEFF_VAL'])],
+                      "correlation": config[cluster].getfloat('PROFIT_CORRELATION', 0.0),
+                      "tightness": config[cluster].getfloat('TIGHTNESS_RATIO', 0.0),
+                      "sidecar": config[cluster].getboolean('INSTANCE_CACHE', False)}
+            df_list = generateClusterOfIstances(num_instances, var_range, constr_range, cluster, seed,
+                                                config[cluster].getint('GENERATION_JOBS', 0), params)
             df = pd.DataFrame(df_list)
             df.columns = columns
             df.to_csv("correlations/"+cluster+'_corr.csv',index=False)
 
 
-def generateClusterOfIstances(num_instances, var_range, constr_range, cluster_type) : 
+def generateClusterOfIstances(num_instances, var_range, constr_range, cluster_type, seed=None, n_jobs=0, params={}) : 
     '''
     This function generate different clusters of istances.
     A cluster has a specific number of variables and number of contraints.
+    Every instance gets its own seed, spawned from the seed of the cluster, so that the cluster is
+    the same whatever the number of processes generating it.
 
     Arguments:
         num_instances : number of istances to generate
         var_range : the range between which a random number of variables will be created
         constr_range : the range between which a random number of constraints will be created
         cluster_type : the cluster type 
+        seed : the seed of the cluster (None = from the clock)
+        n_jobs : number of processes generating the instances (0 = one for each core if the cluster
+                 has at least PARALLEL_GENERATION_MIN_COEFFICIENTS coefficients, otherwise serial)
+        params : the other arguments of generateInstance
     '''
     print("\tGenerating ",num_instances,"instances for cluster type " , cluster_type,"...")
-    df_list=[]
-    for instance_num in range(0,num_instances):
-        list = []
-        vars = random.randint(var_range[0], var_range[1])
-        constr = random.randint(constr_range[0], constr_range[1])
-        corr,name = generateInstance(instance_num,vars,constr,cluster_type)
-        list.append(corr)
-        list.append(name)
-        df_list.append(list)
+    sequence = np.random.SeedSequence(int(getSeed()) if seed is None else seed)
+    rng = np.random.default_rng(sequence)
+    sizes = zip(rng.integers(var_range[0], var_range[1]+1, num_instances), rng.integers(constr_range[0], constr_range[1]+1, num_instances))
+    jobs = [(instance_num, int(vars), int(constr), cluster_type, instance_seed)
+            for instance_num, ((vars, constr), instance_seed) in enumerate(zip(sizes, sequence.spawn(num_instances)))]
+    if n_jobs <= 0:
+        coefficients = sum(nvar * nconstraints for _, nvar, nconstraints, _, _ in jobs)
+        n_jobs = (os.cpu_count() or 1) if coefficients >= PARALLEL_GENERATION_MIN_COEFFICIENTS else 1
+    n_jobs = min(n_jobs, num_instances)
+    if n_jobs > 1:
+        with multiprocessing.get_context().Pool(n_jobs) as pool:
+            df_list = pool.starmap(functools.partial(generateInstance, **params), jobs)
+    else:
+        df_list = [generateInstance(*job, **params) for job in jobs]
     print("\t...Done.")
-    return df_list
+    return [list(row) for row in df_list]
 
-def generateInstance(instance_num : int, nvar : int , nconstraints : int, cluster_type : str):
+def generateInstance(instance_num : int, nvar : int , nconstraints : int, cluster_type : str, seed = None, path_name : str = None,
+                     coefficients_range : list = None, correlation : float = 0.0, tightness : float = 0.0, sidecar : bool = False):
     '''
     This function generate a cluster of istances with a specific number of var and number of contraints. 
+    All the coefficients are drawn at once and the instance is written with a single write.
     
     Arguments:
         instance_num : number of istances to generate
         nvar : number of variables of the problem to generate
         nconstraints : number of the constraints of the problem to generate
         cluster_type : the cluster type
+        seed : the seed of the instance, an int or a numpy SeedSequence (None = from the clock)
+        path_name : the directory of the instance (None = instances/cluster_type)
+        coefficients_range : [min, max] of the coefficients (None = from the cluster configuration)
+        correlation : 0 = profits independent of the weights, 1 = each profit equal to the mean weight of its variable
+        tightness : each right hand side is this fraction of the sum of its row (0 = random, between min*nvar and max*nvar)
+        sidecar : also write the binary sidecar of the instance (see getProblemData)
     '''
-    random.seed(getSeed())
-    config = ConfigParser()
-    config.read('config.ini')
-    coefficients_range=[int(config[cluster_type]['MIN_COEFF_VAL']),int(config[cluster_type]['MAX_COEFF_VAL'])]
+    rng = np.random.default_rng(int(getSeed()) if seed is None else seed)
+    if coefficients_range is None:
+        config = store.get_config()
+        coefficients_range=[int(config[cluster_type]['MIN_COEFF_VAL']),int(config[cluster_type]['MAX_COEFF_VAL'])]
+    low, high = coefficients_range
     instanceName="inst_"+str(instance_num)+".txt"
-    path_name="instances/"+cluster_type
-    if not os.path.exists(path_name):
-        os.makedirs(path_name)
-    instance = open(path_name+"/"+instanceName, "w")
-    instance.write(str(nvar)+" "+str(nconstraints)+"\n")
-    profits=[]
-    weights=[]
-    
-    # Let's write the constraints 
-    for constraint in range(0,nconstraints+1): # The +1 is for the objective function
-        weights_i=[]
-        for var in range(0,nvar):
-            n=random.randint(coefficients_range[0],coefficients_range[1])
-            instance.write(" "+str(n))
-            if constraint==0 : #objective function
-                profits.append(n)
-            else : 
-                weights_i.append(n)
-        if not constraint==0 :
-            weights.append(weights_i)
-        instance.write("\n")
-
-    mean_weights = []
-    for p in range(0,len(profits)):  # prendo una variabile
-        profit = profits[p] 
-        sum_weights=0
-        for w in weights :
-           sum_weights += w[p]
-        mean_weights.append(sum_weights/nconstraints)
-    
-    
+    if path_name is None:
+        path_name="instances/"+cluster_type
+    os.makedirs(path_name, exist_ok=True)
+
+    weights = rng.integers(low, high+1, (nconstraints, nvar))
+    mean_weights = weights.mean(axis=0)
+    profits = rng.integers(low, high+1, nvar)
+    if correlation > 0:
+        profits = np.clip(np.rint((1-correlation)*profits + correlation*mean_weights), low, high).astype(np.int64)
     # Let's write the limits
-    for constraint in range(0,nconstraints):
-        n=random.randint(coefficients_range[0]*nvar,coefficients_range[1]*nvar)
-        instance.write(" "+str(n))
-
-    instance.close()
-    assert(len(profits)==len(mean_weights))
-    
-    corr, _ = pearsonr(profits, mean_weights)
-
+    if tightness > 0:
+        limits = np.maximum(np.rint(tightness*weights.sum(axis=1)), 1).astype(np.int64)
+    else:
+        limits = rng.integers(low*nvar, high*nvar+1, nconstraints)
+
+    # The objective function, the constraints and the limits in a single write
+    output = io.StringIO()
+    output.write(str(nvar)+" "+str(nconstraints)+"\n")
+    np.savetxt(output, np.vstack((profits, weights)), fmt="%d", delimiter=" ")
+    np.savetxt(output, limits[None, :], fmt="%d", delimiter=" ")
+    with open(path_name+"/"+instanceName, "w") as instance:
+        instance.write(output.getvalue())
+    if sidecar:
+        stat = os.stat(path_name+"/"+instanceName)
+        save_sidecar(os.path.join("cache", path_name+"/"+instanceName+".npy"),
+                     np.concatenate(([SIDECAR_VERSION, stat.st_size, stat.st_mtime, nvar, nconstraints], profits, weights.ravel(), limits)).astype(np.float64))
+
+    if np.ptp(profits) == 0 or np.ptp(mean_weights) == 0:
+        corr = math.nan
+    else:
+        corr, _ = pearsonr(profits, mean_weights)
 
     return corr,instanceName.split(".txt")[0]
 
@@ -153,22 +183,55 @@ def flushLog(logName):
     '''
     This function flushes the log.
     '''
-    with open(logName,'w') as file:
-        pass 
+    with open(logName,'w'):
+        pass
 
     if os.path.exists("lp"):
         shutil.rmtree("lp")
     
     if os.path.exists("solutions"):
         shutil.rmtree("solutions")
+
+    if os.path.exists("workers"):
+        shutil.rmtree("workers")
             
  
     
 
 
+def parseOptions(argv, options):
+    '''
+    This function separates the optional "-option value" pairs from the other command line arguments.
+    
+    Arguments:
+        argv -- the command line arguments
+        options -- the names of the accepted options (e.g. ["-trace"])
+    returns:
+        values -- dictionary option -> value of the options found
+        args -- the remaining arguments, in order
+    '''
+    values = {}
+    args = []
+    i = 0
+    while i < len(argv):
+        if argv[i] in options:
+            if i+1 >= len(argv):
+                invalidInput()
+            values[argv[i]] = argv[i+1]
+            i += 2
+        else:
+            args.append(argv[i])
+            i += 1
+    return values, args
+
 def invalidInput():
     print("Invalid input.\nUsage:\n"
     +"A) Solve all clusters:\n\t--> python main.py -all\n"
     +"B) Solve a specific cluster (cluster_small, cluster_medium_A, cluster_medium_B, cluster_large):\n\t--> python main.py -c cluster_type\n"
-    +"C) Solve a single problem instance:\n\t--> python main.py -s internals/cluster_type/instance_name.txt\n")
+    +"C) Solve a single problem instance:\n\t--> python main.py -s internals/cluster_type/instance_name.txt\n"
+    +"Options:\n\t-trace off|summary|round|tableau --> the detail of resolution.log and rounds.jsonl (default: TRACE_LEVEL in config.ini)\n"
+    +"\t-j N --> solve N instances at a time, each one in its own process (with -all and -c)\n"
+    +"\t-xlsx file.xlsx --> also export the statistics (always written to stats.csv) to an Excel file\n"
+    +"\t-backend cplex|numpy --> the LP solver of the Gomory rounds (default: LP_BACKEND in config.ini)\n"
+    +"\t-profile trace.json --> time every phase (wall and CPU), print a summary table and write a Chrome/Perfetto trace\n")
     sys.exit(-1)
\ No newline at end of file
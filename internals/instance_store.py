@@ -0,0 +1,77 @@
+from internals.solver_utils import getProblemData
+from configparser import ConfigParser
+from collections import OrderedDict
+
+class InstanceStore:
+    '''
+    This class is the run-scoped store of the problem instances and of the configuration:
+    config.ini is read once and every instance is parsed once, then all the phases of the
+    resolution (LP, MIP, Gomory rounds) share the same read-only (c, A, b) arrays.
+    The least recently used instances are evicted when the arrays exceed max_bytes.
+
+    Attributes:
+        config_path -- the configuration file
+        max_bytes -- memory bound of the cached instances (0 = STORE_MAX_MB in the configuration)
+    '''
+    def __init__(self, config_path='config.ini', max_bytes=0):
+        self.config_path = config_path
+        self.max_bytes = max_bytes
+        self._config = None
+        self.overrides = {}
+        self._instances = OrderedDict()
+        self._bytes = 0
+
+    def get_config(self):
+        '''
+        returns:
+            config -- the ConfigParser of the run, read at the first call
+        '''
+        if self._config is None:
+            self._config = ConfigParser()
+            self._config.read(self.config_path)
+            if self.max_bytes <= 0:
+                self.max_bytes = int(self._config['DEFAULT'].getfloat('STORE_MAX_MB', 512) * 1024 * 1024)
+        return self._config
+
+    def override(self, key, value):
+        '''
+        This function sets a configuration value for every cluster of the run (e.g. from the command line).
+        The overrides are kept in the overrides attribute, so that they can be applied again in a worker process.
+        '''
+        config = self.get_config()
+        self.overrides[key] = value
+        config['DEFAULT'][key] = value
+        for section in config.sections():
+            config[section][key] = value
+
+    def get_problem(self, instance, sidecar=False):
+        '''
+        This function returns the data of an instance, parsing it only the first time.
+
+        Arguments:
+            instance -- the path of the .txt file
+            sidecar -- see getProblemData
+        returns:
+            c, A, b -- read-only arrays
+        '''
+        if instance in self._instances:
+            self._instances.move_to_end(instance)
+            return self._instances[instance]
+        self.get_config()
+        data = getProblemData(instance, sidecar)
+        for array in data:
+            array.setflags(write=False)
+        self._instances[instance] = data
+        self._bytes += sum(array.nbytes for array in data)
+        # Evict the least recently used instances (never the one just loaded)
+        while self._bytes > self.max_bytes and len(self._instances) > 1:
+            _, evicted = self._instances.popitem(last=False)
+            self._bytes -= sum(array.nbytes for array in evicted)
+        return data
+
+    def clear(self):
+        self._instances.clear()
+        self._bytes = 0
+
+# The store of the current run (every worker process has its own)
+store = InstanceStore()
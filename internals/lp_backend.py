@@ -0,0 +1,318 @@
+from internals.solver_utils import TableauSnapshot, initializeInstanceVariables, setResources
+from internals.artifacts import StagedFile
+from scipy import sparse
+import numpy as np
+import os
+try:
+    import cplex
+except ImportError:
+    cplex = None
+
+class LPBackend:
+    '''
+    This class is the interface of the LP solvers used by the Gomory loop. The model is
+        max c x  s.t.  A x + s = b,  0 <= x <= 1,  s >= 0
+    with one explicit slack s_i for each row: columns are x0..x(n-1) followed by s0..s(m-1),
+    and the slack of the i-th row is the column n+i, also for the rows added later.
+
+    Attributes:
+        A -- the constraints matrix of the model rows, without slack columns (shape = m * n)
+        b -- the right hand side of the model rows (shape = 1 * m)
+    '''
+    def build(self, c, A, b):
+        raise NotImplementedError
+
+    def add_rows(self, A_rows, rhs, names=None):
+        '''
+        This function appends rows (each one with a new slack) keeping the current basis,
+        so that the next solve is warm started.
+        '''
+        raise NotImplementedError
+
+    def remove_rows(self, rows):
+        '''
+        This function removes rows (and their slacks) whose slack is basic, i.e. non binding rows:
+        the current basis without them is still optimal, but the model has to be solved again
+        before its solution is read.
+        '''
+        raise NotImplementedError
+
+    def solve(self):
+        '''
+        returns:
+            status -- the solution status ("optimal", "infeasible", "abort_time_lim", ...)
+        '''
+        raise NotImplementedError
+
+    def set_time_limit(self, time_limit):
+        '''
+        This function sets the time limit of the next solves (milliseconds, 0 = none): a solve that
+        reaches it stops with the status "abort_time_lim".
+        '''
+        raise NotImplementedError
+
+    def status(self):
+        raise NotImplementedError
+
+    def objective_value(self):
+        raise NotImplementedError
+
+    def values(self):
+        '''
+        returns:
+            x -- the values of all the columns, slacks included (shape = 1 * (n+m))
+        '''
+        raise NotImplementedError
+
+    def names(self):
+        raise NotImplementedError
+
+    def num_rows(self):
+        return self.A.shape[0]
+
+    def num_cols(self):
+        return self.A.shape[1] + self.A.shape[0]
+
+    def tableau(self):
+        '''
+        returns:
+            tableau -- TableauSnapshot of the current optimal basis, with its basis status
+        '''
+        raise NotImplementedError
+
+    def basis_status(self):
+        '''
+        returns:
+            status -- the basis status of all the columns, slacks included: AT_LOWER, BASIC or
+                      AT_UPPER (shape = 1 * (n+m))
+        '''
+        raise NotImplementedError
+
+    def artifacts(self):
+        '''
+        returns:
+            lp, log -- the model (LP format) and its solution, as strings or StagedFile (see ArtifactWriter)
+        '''
+        raise NotImplementedError
+
+    def solve_mip(self, c, A, b, time_limit=0, writer=None, lp_path=None, log_path=None):
+        '''
+        This function solves the binary problem max c x, A x <= b, x in {0,1}.
+
+        Arguments:
+            c, A, b -- the problem instance
+            time_limit -- milliseconds (0 = none)
+            writer, lp_path, log_path -- where to write the "final" artifacts of the MIP (optional)
+        returns:
+            value -- the best objective value found (the best bound if none was found)
+            status -- the MIP status, named as in CPLEX (e.g. "MIP_optimal")
+            best_bound -- the best bound
+        '''
+        raise NotImplementedError
+
+    def set_name(self, name):
+        self.name = name
+
+    def close(self):
+        pass
+
+class CplexBackend(LPBackend):
+    '''
+    This class is the CPLEX implementation of LPBackend: a persistent cplex.Cplex() re-optimized
+    with the dual simplex from the previous basis, the tableau being read with binvarow/binvrow.
+    '''
+    def __init__(self, name, stream=None, workdir=".", threads=0):
+        if cplex is None:
+            raise ImportError("The CPLEX Python API is not installed: use LP_BACKEND = numpy")
+        self.name = name
+        self.stream = stream
+        self.workdir = workdir
+        self.threads = threads
+        self.prob = cplex.Cplex()
+        self._staged = 0
+
+    def build(self, c, A, b):
+        '''
+        This function populates the cplex.Cplex() with the problem in standard form
+        (one explicit slack variable for each constraint) and sets it up for the warm
+        dual simplex re-optimizations of the Gomory rounds.
+        '''
+        nCols, nRows = (len(c)), (len(b))
+        names, lower_bounds, upper_bounds,_,constraint_names = initializeInstanceVariables(nCols,nRows)
+        mkp = self.prob
+        # set MKP
+        mkp.set_problem_name(self.name)
+        mkp.objective.set_sense(mkp.objective.sense.maximize)
+        mkp.set_log_stream(self.stream)
+        mkp.set_error_stream(self.stream)
+        mkp.set_warning_stream(self.stream)
+        mkp.set_results_stream(self.stream)
+        params = mkp.parameters
+        # Disable presolve
+        params.preprocessing.presolve.set(0)
+        params.preprocessing.linear.set(0)
+        params.preprocessing.reduce.set(0)
+        # Re-optimize from the previous basis with the dual simplex once cuts are added
+        params.lpmethod.set(params.lpmethod.values.dual)
+        params.advance.set(1)
+        setResources(mkp, self.workdir, self.threads)
+
+        # Add variables & Slack (bounds and objective in a single call) -----------------------------
+        mkp.variables.add(obj=list(c)+[0.0]*nRows,
+                          lb=lower_bounds,
+                          ub=upper_bounds+[cplex.infinity]*nRows,
+                          names=names)
+        #Add slack to constraints: [A|I] in CSR form, the slacks being a sparse identity
+        A_slack = sparse.hstack((sparse.csr_matrix(A), sparse.identity(nRows, format="csr")), format="csr")
+
+        # Add contraints to Cplex (only the nonzeros) ----------------------------------------------
+        # Equalities: the explicit slack is the slack of the row (CPLEX adds none of its own)
+        mkp.linear_constraints.add(lin_expr= sparse_pairs(A_slack),
+                                   rhs= b.tolist(), names = constraint_names, senses = ['E'] * nRows)
+        self.A = np.array(A, dtype=np.float64)
+        self.b = np.array(b, dtype=np.float64)
+        # Index of the next row added: it only grows, so that the names stay unique once rows are removed
+        self._next_row = nRows
+
+    def add_rows(self, A_rows, rhs, names=None):
+        n_new = len(rhs)
+        nVar = self.A.shape[1]
+        first_slack = self.prob.variables.get_num()
+        first_row = self._next_row
+        self._next_row += n_new
+        if names is None:
+            names = ["r"+str(first_row+k) for k in range(n_new)]
+        A_rows = np.asarray(A_rows, dtype=np.float64).reshape(n_new, nVar)
+        # The new rows in CSR form: their nonzeros and their own slack
+        rows = sparse.hstack((sparse.csr_matrix(A_rows), sparse.csr_matrix((n_new, first_slack-nVar)),
+                              sparse.identity(n_new, format="csr")), format="csr")
+        self.prob.variables.add(lb=[0.0]*n_new, names=["s"+str(first_row+k) for k in range(n_new)])
+        self.prob.linear_constraints.add(
+            lin_expr= sparse_pairs(rows),
+            senses= ['E'] * n_new,
+            rhs= list(rhs),
+            names = names)
+        # Keep the constraints matrix aligned with the model rows
+        self.A = np.append(self.A, A_rows, axis=0)
+        self.b = np.append(self.b, rhs)
+
+    def remove_rows(self, rows):
+        nVar = self.A.shape[1]
+        self.prob.linear_constraints.delete(list(rows))
+        self.prob.variables.delete([nVar+i for i in rows])
+        keep = np.ones(len(self.b), dtype=bool)
+        keep[rows] = False
+        self.A = self.A[keep]
+        self.b = self.b[keep]
+
+    def solve(self):
+        self.prob.solve()
+        return self.status()
+
+    def set_time_limit(self, time_limit):
+        if time_limit > 0:
+            self.prob.parameters.timelimit.set(time_limit / 1000)
+        else:
+            self.prob.parameters.timelimit.reset()
+
+    def status(self):
+        return self.prob.solution.status[self.prob.solution.get_status()]
+
+    def objective_value(self):
+        return self.prob.solution.get_objective_value()
+
+    def values(self):
+        return np.array(self.prob.solution.get_values())
+
+    def names(self):
+        return self.prob.variables.get_names()
+
+    def tableau(self):
+        return TableauSnapshot(np.array(self.prob.solution.advanced.binvarow(), dtype=np.float64),
+                               np.array(self.prob.solution.advanced.binvrow(), dtype=np.float64),
+                               self.b, self.names(), self.basis_status())
+
+    def basis_status(self):
+        # The slacks are columns of the model, so the status of the columns covers them
+        return np.array(self.prob.solution.basis.get_basis()[0])
+
+    def artifacts(self):
+        return self._stage(self.prob)
+
+    def _stage(self, prob):
+        '''
+        This function writes the model and its solution (CPLEX .sol format) of the problem (cplex.Cplex())
+        in staging files of the working directory, moved to their destination by the ArtifactWriter.
+        '''
+        self._staged += 1
+        base = os.path.join(self.workdir, "artifact_"+self.name+"_"+str(self._staged))
+        prob.write(base+".lp")
+        prob.solution.write(base+".sol")
+        return StagedFile(base+".lp"), StagedFile(base+".sol")
+
+    def set_name(self, name):
+        self.name = name
+        self.prob.set_problem_name(name)
+
+    def close(self):
+        self.prob.end()
+
+    def solve_mip(self, c, A, b, time_limit=0, writer=None, lp_path=None, log_path=None):
+        nCols, nRows = (len(c), len(b))
+        names, _, _, constraint_senses, constraint_names = initializeInstanceVariables(nCols, nRows)
+        with cplex.Cplex() as mkp:
+            mkp.set_problem_name(self.name)
+            mkp.objective.set_sense(mkp.objective.sense.maximize)
+            mkp.set_log_stream(None)
+            mkp.set_error_stream(None)
+            mkp.set_warning_stream(None)
+            mkp.set_results_stream(None)
+            params = mkp.parameters
+            # Disable presolve
+            params.preprocessing.presolve.set(0)
+            setResources(mkp, self.workdir, self.threads)
+            if time_limit > 0:
+                params.timelimit.set(time_limit / 1000)
+            # Add variables, objective function and contraints -----------------------------------
+            mkp.variables.add(obj=list(c), names=names[:nCols], types=[mkp.variables.type.binary] * nCols)
+            mkp.linear_constraints.add(lin_expr= sparse_pairs(sparse.csr_matrix(A)),
+                                       rhs= b.tolist(), names = constraint_names, senses = constraint_senses)
+            # Resolve the problem instance
+            mkp.solve()
+            status = mkp.solution.status[mkp.solution.get_status()]
+            best_bound = mkp.solution.MIP.get_best_objective()
+            if mkp.solution.is_primal_feasible():
+                value = mkp.solution.get_objective_value()
+            else:
+                # No solution within the time limit: the best bound is the only reference
+                value = best_bound
+            if writer is not None:
+                writer.write_model("final", lambda: self._stage(mkp), lp_path, log_path)
+        return value, status, best_bound
+
+def sparse_pairs(matrix):
+    '''
+    This function converts the rows of a CSR matrix to cplex.SparsePair (nonzeros only).
+    '''
+    indptr, indices, data = matrix.indptr, matrix.indices.tolist(), matrix.data.tolist()
+    return [cplex.SparsePair(ind= indices[indptr[i]:indptr[i+1]], val= data[indptr[i]:indptr[i+1]]) for i in range(matrix.shape[0])]
+
+# Available backends (LP_BACKEND in config.ini)
+BACKENDS = ["cplex", "numpy"]
+
+def make_backend(kind, name, stream=None, workdir=".", threads=0):
+    '''
+    This function creates the LP backend of an instance.
+
+    Arguments:
+        kind -- one of BACKENDS
+        name -- the problem name
+        stream -- the stream for the solver logs (CPLEX only)
+        workdir, threads -- see setResources (CPLEX only)
+    '''
+    if kind == "cplex":
+        return CplexBackend(name, stream, workdir, threads)
+    if kind == "numpy":
+        from internals.numpy_backend import NumpyBackend
+        return NumpyBackend(name)
+    raise ValueError("Unknown LP backend '"+str(kind)+"', expected one of: "+", ".join(BACKENDS))
@@ -0,0 +1,267 @@
+from internals.lp_backend import LPBackend
+from internals.solver_utils import TableauSnapshot, AT_LOWER, BASIC, AT_UPPER
+from scipy.linalg import lu_factor, lu_solve
+from scipy.optimize import milp, LinearConstraint, Bounds
+import numpy as np
+import time
+
+# Tolerances of the simplex
+PRIMAL_TOL = 1e-9
+PIVOT_TOL = 1e-9
+# Number of eta updates of the basis factorization before it is computed again
+REFACTOR_EVERY = 50
+
+# CPLEX names of the outcomes of scipy.optimize.milp (by status code)
+MIP_STATUS = {0: "MIP_optimal", 1: "MIP_time_limit_feasible", 2: "MIP_infeasible", 3: "MIP_unbounded", 4: "MIP_abort_infeasible"}
+
+class NumpyBackend(LPBackend):
+    '''
+    This class is an LP backend that does not need CPLEX: a bounded dual simplex written with NumPy on
+        min -c x  s.t.  [A|I] (x,s) = b,  0 <= x <= 1,  s >= 0
+    The initial basis (all the slacks, every x_j with c_j > 0 at its upper bound) is dual feasible,
+    and it stays dual feasible when rows are appended (their slacks enter the basis), so every
+    round is warm started from the previous optimal basis. The basis is kept as an LU factorization
+    (scipy.linalg.lu_factor) updated in product form, and the tableau is computed from it directly.
+    The slack identity is never stored: the slack columns are unit vectors, only A is kept.
+
+    Attributes:
+        A, b -- the model rows without slack columns and their right hand side
+        max_iterations -- simplex iterations of a solve before "abort_it_lim" (0 = unlimited)
+        time_limit -- milliseconds of a solve before "abort_time_lim" (0 = unlimited)
+    '''
+    def __init__(self, name, max_iterations=0):
+        self.name = name
+        self.max_iterations = max_iterations
+        self.time_limit = 0
+        self.iterations = 0
+        self._status = "unknown"
+
+    def build(self, c, A, b):
+        nCols, nRows = (len(c)), (len(b))
+        self.c = np.array(c, dtype=np.float64)
+        self.A = np.array(A, dtype=np.float64)
+        self.b = np.array(b, dtype=np.float64)
+        self._cost = np.concatenate((-self.c, np.zeros(nRows)))
+        self._lower = np.zeros(nCols+nRows)
+        self._upper = np.concatenate((np.ones(nCols), np.full(nRows, np.inf)))
+        self._basis = np.arange(nCols, nCols+nRows)
+        self._is_basic = np.zeros(nCols+nRows, dtype=bool)
+        self._is_basic[self._basis] = True
+        self._at_upper = np.zeros(nCols+nRows, dtype=bool)
+        self._at_upper[:nCols] = self.c > 0
+        self._factorize()
+
+    def add_rows(self, A_rows, rhs, names=None):
+        A_rows = np.asarray(A_rows, dtype=np.float64).reshape(len(rhs), self.A.shape[1])
+        n_new = len(rhs)
+        nTot = len(self._cost)
+        self._cost = np.concatenate((self._cost, np.zeros(n_new)))
+        self._lower = np.concatenate((self._lower, np.zeros(n_new)))
+        self._upper = np.concatenate((self._upper, np.full(n_new, np.inf)))
+        self._basis = np.concatenate((self._basis, np.arange(nTot, nTot+n_new)))
+        self._is_basic = np.concatenate((self._is_basic, np.ones(n_new, dtype=bool)))
+        self._at_upper = np.concatenate((self._at_upper, np.zeros(n_new, dtype=bool)))
+        self.A = np.append(self.A, A_rows, axis=0)
+        self.b = np.append(self.b, rhs)
+        self._factorize()
+
+    def remove_rows(self, rows):
+        nCols = self.A.shape[1]
+        slacks = nCols + np.asarray(rows, dtype=int)
+        if not self._is_basic[slacks].all():
+            raise ValueError("Only the rows with a basic slack can be removed")
+        keep_rows = np.ones(len(self.b), dtype=bool)
+        keep_rows[rows] = False
+        keep = np.ones(len(self._cost), dtype=bool)
+        keep[slacks] = False
+        # New index of every column that is kept
+        index = np.cumsum(keep) - 1
+        self._basis = index[self._basis[keep[self._basis]]]
+        self._cost = self._cost[keep]
+        self._lower = self._lower[keep]
+        self._upper = self._upper[keep]
+        self._is_basic = self._is_basic[keep]
+        self._at_upper = self._at_upper[keep]
+        self.A = self.A[keep_rows]
+        self.b = self.b[keep_rows]
+        self._factorize()
+
+    def solve(self):
+        '''
+        This function runs the dual simplex from the current basis: at each iteration the basic
+        variable with the largest bound violation leaves the basis, and the entering variable is
+        chosen by the ratio test on the reduced costs (ties broken by the largest pivot).
+        '''
+        iterations = 0
+        stop = time.perf_counter() + self.time_limit / 1000 if self.time_limit > 0 else None
+        while True:
+            x_B = self._basic_values()
+            lower_B = self._lower[self._basis]
+            upper_B = self._upper[self._basis]
+            infeasibility = np.maximum(lower_B-x_B, 0) + np.maximum(x_B-upper_B, 0)
+            r = np.argmax(infeasibility)
+            if infeasibility[r] <= PRIMAL_TOL:
+                self._status = "optimal"
+                break
+            if self.max_iterations > 0 and iterations >= self.max_iterations:
+                self._status = "abort_it_lim"
+                break
+            if stop is not None and time.perf_counter() >= stop:
+                self._status = "abort_time_lim"
+                break
+            # Row r of the tableau and reduced costs
+            e_r = np.zeros(len(self._basis))
+            e_r[r] = 1.0
+            alpha = self._price(self._btran(e_r))
+            d = self._cost - self._price(self._btran(self._cost[self._basis]))
+            to_lower = x_B[r] < lower_B[r]
+            # Columns whose move takes the leaving variable towards its violated bound
+            if to_lower:
+                eligible = (~self._at_upper & (alpha < -PIVOT_TOL)) | (self._at_upper & (alpha > PIVOT_TOL))
+            else:
+                eligible = (~self._at_upper & (alpha > PIVOT_TOL)) | (self._at_upper & (alpha < -PIVOT_TOL))
+            eligible &= ~self._is_basic
+            candidates = np.nonzero(eligible)[0]
+            if len(candidates) == 0:
+                self._status = "infeasible"
+                break
+            ratios = np.abs(d[candidates]) / np.abs(alpha[candidates])
+            ties = candidates[ratios <= ratios.min() + PRIMAL_TOL]
+            q = ties[np.argmax(np.abs(alpha[ties]))]
+            # Pivot
+            leaving = self._basis[r]
+            self._is_basic[leaving] = False
+            self._at_upper[leaving] = not to_lower
+            self._basis[r] = q
+            self._is_basic[q] = True
+            self._at_upper[q] = False
+            self._etas.append((r, self._ftran(self._column(q))))
+            if len(self._etas) >= REFACTOR_EVERY:
+                self._factorize()
+            iterations += 1
+        self.iterations += iterations
+        self._x = self._values()
+        return self._status
+
+    def set_time_limit(self, time_limit):
+        self.time_limit = time_limit
+
+    def status(self):
+        return self._status
+
+    def objective_value(self):
+        return float(self.c @ self._x[:len(self.c)])
+
+    def values(self):
+        return self._x
+
+    def names(self):
+        nCols = self.A.shape[1]
+        return ["x"+str(j) for j in range(nCols)] + ["s"+str(i) for i in range(self.A.shape[0])]
+
+    def tableau(self):
+        Binv = self._ftran(np.identity(len(self._basis)))
+        return TableauSnapshot(np.hstack((Binv @ self.A, Binv)), Binv, self.b, self.names(), self.basis_status())
+
+    def basis_status(self):
+        return np.where(self._is_basic, BASIC, np.where(self._at_upper, AT_UPPER, AT_LOWER))
+
+    def artifacts(self):
+        names = self.names()
+        output = ["status = "+self._status, "objective = "+repr(self.objective_value())]
+        output += [name+" = "+repr(value) for name, value in zip(names, self._x)]
+        return lp_as_string(self.name, self.c, self.A, self.b, names, slacks=True), "\n".join(output)+"\n"
+
+    def solve_mip(self, c, A, b, time_limit=0, writer=None, lp_path=None, log_path=None):
+        options = {"time_limit": time_limit / 1000} if time_limit > 0 else {}
+        result = milp(-np.asarray(c), constraints=LinearConstraint(A, -np.inf, b), integrality=np.ones(len(c)),
+                      bounds=Bounds(0, 1), options=options)
+        status = MIP_STATUS.get(result.status, "MIP_error")
+        if result.status == 1 and result.x is None:
+            status = "MIP_time_limit_infeasible"
+        best_bound = -result.mip_dual_bound if getattr(result, "mip_dual_bound", None) is not None else np.inf
+        value = -result.fun if result.x is not None else best_bound
+        if writer is not None:
+            names = ["x"+str(j) for j in range(len(c))]
+            solution = ["status = "+status, "objective = "+repr(value)]
+            if result.x is not None:
+                solution += [name+" = "+repr(x) for name, x in zip(names, result.x)]
+            writer.write_model("final", lambda: (lp_as_string(self.name, c, A, b, names, binary=True), "\n".join(solution)+"\n"), lp_path, log_path)
+        return value, status, best_bound
+
+    def _factorize(self):
+        nCols, nRows = self.A.shape[1], self.A.shape[0]
+        B = np.zeros((nRows, nRows))
+        structural = self._basis < nCols
+        B[:, structural] = self.A[:, self._basis[structural]]
+        B[self._basis[~structural]-nCols, np.nonzero(~structural)[0]] = 1.0
+        self._lu = lu_factor(B)
+        self._etas = []
+
+    def _column(self, j):
+        '''
+        This function returns the column j of [A|I].
+        '''
+        nCols = self.A.shape[1]
+        if j < nCols:
+            return self.A[:, j]
+        column = np.zeros(self.A.shape[0])
+        column[j-nCols] = 1.0
+        return column
+
+    def _price(self, y):
+        '''
+        This function computes y [A|I].
+        '''
+        return np.concatenate((y @ self.A, y))
+
+    def _ftran(self, v):
+        '''
+        This function solves B y = v (v can be a matrix).
+        '''
+        y = lu_solve(self._lu, v)
+        for r, column in self._etas:
+            y_r = y[r] / column[r]
+            y = y - np.multiply.outer(column, y_r)
+            y[r] = y_r
+        return y
+
+    def _btran(self, v):
+        '''
+        This function solves y B = v.
+        '''
+        v = np.array(v, dtype=np.float64)
+        for r, column in reversed(self._etas):
+            v[r] = (v[r] - (column @ v - column[r]*v[r])) / column[r]
+        return lu_solve(self._lu, v, trans=1)
+
+    def _basic_values(self):
+        # Only the x_j can be at their upper bound (the slacks have none)
+        nonbasic_upper = (self._at_upper & ~self._is_basic)[:self.A.shape[1]]
+        return self._ftran(self.b - self.A[:, nonbasic_upper].sum(axis=1))
+
+    def _values(self):
+        x = np.where(self._at_upper, self._upper, self._lower)
+        x[self._basis] = self._basic_values()
+        return x
+
+def lp_as_string(name, c, A, b, names, slacks=False, binary=False):
+    '''
+    This function writes a model max c x, A x <= b (or A x + s = b with slacks=True) in LP format.
+    '''
+    def expression(coefs):
+        return " ".join(("+ " if coef >= 0 else "- ")+repr(abs(coef))+" "+names[j] for j, coef in enumerate(coefs) if coef != 0)
+    nCols = len(c)
+    output = ["\\Problem name: "+name, "", "Maximize", " obj: "+expression(c), "Subject To"]
+    for i in range(A.shape[0]):
+        if slacks:
+            output.append(" c"+str(i)+": "+expression(A[i])+" + "+names[nCols+i]+" = "+repr(float(b[i])))
+        else:
+            output.append(" c"+str(i)+": "+expression(A[i])+" <= "+repr(float(b[i])))
+    output.append("Bounds")
+    output += [" 0 <= "+names[j]+" <= 1" for j in range(nCols)]
+    if binary:
+        output.append("Binaries")
+        output.append(" "+" ".join(names[:nCols]))
+    output.append("End")
+    return "\n".join(output)+"\n"
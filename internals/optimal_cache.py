@@ -0,0 +1,56 @@
+import numpy as np
+import hashlib
+import json
+import os
+
+# One JSON file for each instance, named after the hash of its contents
+CACHE_DIR = os.path.join("cache", "optimal")
+
+def instance_key(c, A, b):
+    '''
+    This function computes the content address of an instance: the SHA-256 of its data,
+    so that the same instance gets the same key whatever its file name or formatting.
+    '''
+    digest = hashlib.sha256()
+    digest.update(np.array(A.shape, dtype=np.int64).tobytes())
+    for array in (c, A, b):
+        digest.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+def load_optimal(key, time_limit=0):
+    '''
+    This function looks up the MIP result of an instance.
+    A result that is not proven optimal is only reused if it was obtained with at least
+    the given time limit, or without one.
+
+    Arguments:
+        key -- see instance_key
+        time_limit -- the configured time limit of the MIP that would be run (MIP_TIME_LIMIT,
+                      whole milliseconds, 0 = none)
+    returns:
+        entry -- dictionary with value, status, best_bound, optimal and time_limit (None on a miss)
+    '''
+    path = os.path.join(CACHE_DIR, key+".json")
+    try:
+        with open(path) as file:
+            entry = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if not entry["optimal"]:
+        if int(time_limit) <= 0 or (entry["time_limit"] > 0 and entry["time_limit"] < int(time_limit)):
+            return None
+    return entry
+
+def save_optimal(key, value, status, best_bound, optimal, time_limit=0):
+    '''
+    This function records the MIP result of an instance (atomically, workers may share the cache),
+    with the configured time limit of the MIP (see load_optimal).
+    '''
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    entry = {"value": value, "status": status, "best_bound": best_bound, "optimal": optimal, "time_limit": int(time_limit)}
+    path = os.path.join(CACHE_DIR, key+".json")
+    tmp_path = path+"."+str(os.getpid())+".tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(entry, file)
+    os.replace(tmp_path, path)
+    return entry
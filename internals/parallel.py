@@ -0,0 +1,113 @@
+from internals.solver import solveProblem
+from internals.instance_store import store
+from internals.tracing import set_trace_level, get_trace_level, open_records, close_records, merge_records
+from internals.profiling import enable_profiling, profiling, save_profile, merge_profile
+import multiprocessing
+import logging
+import pickle
+import shutil
+import time
+import os
+
+def solveInParallel(jobs, n_jobs, stats, threads=0):
+    '''
+    This function solves the problem instances on a pool of n_jobs worker processes.
+    Every worker has its own working directory (workers/cluster_type/instance_name) with its own
+    resolution.log, rounds.jsonl, profile.json and cplexEvents.log, and its own CPLEX thread budget.
+    An instance that crashes or exceeds its timeout is reported and the batch goes on.
+    The statistics are merged in the order of the jobs, whatever the completion order.
+
+    Arguments:
+        jobs -- list of (instance, cluster_type, timeout in milliseconds, 0 = none)
+        n_jobs -- the number of worker processes
+        stats -- the StatsCollector of the run
+        threads -- CPLEX threads of each worker (0 = cores / n_jobs)
+    returns:
+        stats
+    '''
+    if threads <= 0:
+        threads = max(1, (os.cpu_count() or 1) // n_jobs)
+    context = multiprocessing.get_context()
+    outcomes = [None] * len(jobs)
+    pending = list(range(len(jobs)))
+    running = {}
+    while pending or running:
+        # Fill the free workers
+        while pending and len(running) < n_jobs:
+            i = pending.pop(0)
+            instance, cluster, timeout = jobs[i]
+            workdir = workerDir(instance, cluster)
+            if os.path.exists(workdir):
+                shutil.rmtree(workdir)
+            os.makedirs(workdir)
+            process = context.Process(target=solveWorker, args=(instance, cluster, workdir, threads, get_trace_level(), store.overrides, profiling()))
+            process.start()
+            running[i] = (process, time.monotonic())
+        # Collect the finished (or expired) ones
+        for i, (process, start) in list(running.items()):
+            timeout = jobs[i][2]
+            if not process.is_alive():
+                process.join()
+                outcomes[i] = "done" if process.exitcode == 0 else "crashed"
+            elif timeout > 0 and (time.monotonic()-start) * 1000 > timeout:
+                process.kill()
+                process.join()
+                outcomes[i] = "timeout"
+            else:
+                continue
+            del running[i]
+            print("\t", jobs[i][1], jobs[i][0], "->", outcomes[i])
+        time.sleep(0.05)
+
+    # Merge everything in the order of the jobs
+    for (instance, cluster, timeout), outcome in zip(jobs, outcomes):
+        workdir = workerDir(instance, cluster)
+        mergeFile(os.path.join(workdir, "resolution.log"), "resolution.log")
+        merge_records(os.path.join(workdir, "rounds.jsonl"))
+        merge_profile(os.path.join(workdir, "profile.json"))
+        stats_path = os.path.join(workdir, "stats.pkl")
+        if outcome == "done" and os.path.exists(stats_path):
+            with open(stats_path, "rb") as file:
+                stats_i = pickle.load(file)
+            stats.extend(stats_i)
+        else:
+            logging.info("Instance '%s' of cluster '%s' not solved: %s", instance, cluster, outcome)
+            stats.append({"name": instance.split(".txt")[0], "cluster_type": cluster, "status": outcome})
+        stats.flush()
+    return stats
+
+def solveWorker(instance, cluster, workdir, threads, trace_level, overrides={}, profile=False):
+    '''
+    This function is the body of a worker process: it redirects the logs to the working directory,
+    applies the configuration overrides of the run, solves the instance and saves its statistics
+    rows in workdir/stats.pkl (and its spans in workdir/profile.json when the run is profiled).
+    '''
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = logging.FileHandler(os.path.join(workdir, "resolution.log"), mode="w")
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S'))
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+    set_trace_level(trace_level)
+    for key, value in overrides.items():
+        store.override(key, value)
+    open_records(os.path.join(workdir, "rounds.jsonl"))
+    enable_profiling(profile)
+    stats_i = solveProblem("instances/"+cluster+"/"+instance, cluster, workdir, threads)
+    close_records()
+    if profile:
+        save_profile(os.path.join(workdir, "profile.json"))
+    with open(os.path.join(workdir, "stats.pkl"), "wb") as file:
+        pickle.dump(stats_i, file)
+
+def workerDir(instance, cluster):
+    return os.path.join("workers", cluster, instance.split(".txt")[0])
+
+def mergeFile(source, destination):
+    '''
+    This function appends the content of a worker file to the file of the whole run.
+    '''
+    if os.path.exists(source):
+        with open(source, "rb") as src, open(destination, "ab") as dst:
+            shutil.copyfileobj(src, dst)
@@ -0,0 +1,157 @@
+import threading
+import json
+import time
+import os
+
+_enabled = False
+_events = []
+_stack = []
+
+class Span:
+    '''
+    This class is a timed phase of the resolution, used as a context manager:
+        with span("solve", round=3) as s:
+            lp.solve()
+        s.wall_ms
+    The wall time is always measured (two perf_counter calls), so the callers can use it for their
+    statistics; the CPU time, the nesting and the event of the trace are only kept when profiling is on.
+
+    Attributes:
+        name -- the phase name
+        args -- optional details shown in the trace (e.g. the round number)
+        wall_ms, cpu_ms -- the wall and CPU (of the process) milliseconds of the span, once closed
+    '''
+    __slots__ = ("name", "args", "wall_ms", "cpu_ms", "_start", "_cpu_start", "_path")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.wall_ms = 0.0
+        self.cpu_ms = 0.0
+
+    def __enter__(self):
+        if _enabled:
+            _stack.append(self.name)
+            self._path = "/".join(_stack)
+            self._cpu_start = time.process_time()
+        self._start = time.perf_counter()
+        return self
+
+    def elapsed_ms(self):
+        '''
+        This function returns the wall milliseconds since the span was opened (it can still be open).
+        '''
+        return (time.perf_counter()-self._start) * 1000
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.wall_ms = (end-self._start) * 1000
+        if _enabled:
+            self.cpu_ms = (time.process_time()-self._cpu_start) * 1000
+            _stack.pop()
+            _events.append({"name": self.name, "path": self._path, "ts": self._start * 1e6, "dur": self.wall_ms * 1000,
+                            "cpu_ms": self.cpu_ms, "pid": os.getpid(), "tid": threading.get_native_id(), "args": self.args})
+        return False
+
+def span(name, **args):
+    '''
+    This function opens a span named after the phase it times (see Span).
+    '''
+    return Span(name, args)
+
+def enable_profiling(enabled=True):
+    '''
+    This function turns the profiling of the run on (or off) and forgets the spans recorded so far.
+    '''
+    global _enabled
+    _enabled = enabled
+    reset_profiling()
+
+def profiling():
+    return _enabled
+
+def reset_profiling():
+    del _events[:]
+    del _stack[:]
+
+def save_profile(path):
+    '''
+    This function saves the spans recorded so far (e.g. by a worker process), to be merged with merge_profile.
+    '''
+    with open(path, "w") as file:
+        json.dump(_events, file, separators=(",", ":"))
+
+def merge_profile(path):
+    '''
+    This function appends the spans saved by another process to the ones of the run.
+    '''
+    if _enabled and os.path.exists(path):
+        with open(path) as file:
+            _events.extend(json.load(file))
+
+def export_chrome_trace(path):
+    '''
+    This function writes the spans in the Chrome trace event format, readable by chrome://tracing
+    and https://ui.perfetto.dev (one track for each process).
+    '''
+    events = []
+    for event in _events:
+        args = dict(event["args"])
+        args["cpu_ms"] = round(event["cpu_ms"], 3)
+        events.append({"name": event["name"], "cat": event["path"].split("/")[0], "ph": "X", "ts": round(event["ts"], 3),
+                       "dur": round(event["dur"], 3), "pid": event["pid"], "tid": event["tid"], "args": args})
+    with open(path, "w") as file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file, separators=(",", ":"))
+
+def profile_summary():
+    '''
+    This function aggregates the spans by nesting path (e.g. instance/round/cut/solve).
+
+    returns:
+        rows -- list of dictionaries with the path, the number of calls and the total wall, self
+                (wall time not spent in nested spans), CPU and mean milliseconds; each path is
+                followed by its nested ones, in the order in which they were first opened
+    '''
+    rows = {}
+    first = {}
+    for event in _events:
+        path = event["path"]
+        if path not in rows:
+            rows[path] = {"path": path, "calls": 0, "wall_ms": 0.0, "self_ms": 0.0, "cpu_ms": 0.0}
+            first[path] = event["ts"]
+        row = rows[path]
+        row["calls"] += 1
+        row["wall_ms"] += event["dur"] / 1000
+        row["self_ms"] += event["dur"] / 1000
+        row["cpu_ms"] += event["cpu_ms"]
+        first[path] = min(first[path], event["ts"])
+    # The nested spans close before their parent: their time is removed once every path is known
+    for event in _events:
+        parent = event["path"].rpartition("/")[0]
+        if parent in rows:
+            rows[parent]["self_ms"] -= event["dur"] / 1000
+    children = {}
+    for path in sorted(rows, key=first.get):
+        rows[path]["mean_ms"] = rows[path]["wall_ms"] / rows[path]["calls"]
+        parent = path.rpartition("/")[0]
+        children.setdefault(parent if parent in rows else None, []).append(path)
+    # Every path is followed by its nested paths
+    ordered = []
+    pending = list(reversed(children.get(None, [])))
+    while pending:
+        path = pending.pop()
+        ordered.append(rows[path])
+        pending += reversed(children.get(path, []))
+    return ordered
+
+def summary_table():
+    '''
+    This function formats profile_summary as a text table, the nested spans being indented.
+    '''
+    rows = profile_summary()
+    lines = ["%-32s %8s %12s %12s %12s %10s" % ("span", "calls", "wall ms", "self ms", "cpu ms", "mean ms")]
+    for row in rows:
+        depth = row["path"].count("/")
+        label = "  " * depth + row["path"].rpartition("/")[2]
+        lines.append("%-32s %8d %12.3f %12.3f %12.3f %10.3f" % (label, row["calls"], row["wall_ms"], row["self_ms"], row["cpu_ms"], row["mean_ms"]))
+    return "\n".join(lines)
@@ -0,0 +1,411 @@
+from internals.solver_utils import get_tableau, initialize_fract_gc, initialize_gmi_gc, generate_gc
+from internals.profiling import span
+from internals.tracing import *
+import numpy as np
+import logging
+
+# Values closer than this to an integer are integer (rows of the zero-half cuts)
+INTEGER_TOL = 1e-9
+# Tightest rows aggregated by the MIR separator (singles and pairs), and largest coefficients of
+# the fractional variables tried as scaling factors, each one also divided by MIR_DIVISORS
+MIR_ROWS = 20
+MIR_DELTAS = 4
+MIR_DIVISORS = [1, 2, 4, 8]
+
+class Separator:
+    '''
+    This class is the interface of the cut separators called at every Gomory round. A separator
+    looks at the current LP (its rows and its solution) and returns cuts coefs x <= limit on the
+    problem variables; iterateGomory filters them (filter_cuts) and sends them to the cut pool.
+
+    Attributes:
+        name -- the name of the separator (SEPARATORS in config.ini)
+        info -- details of the last call: the cuts found, their milliseconds and what the separator
+                adds (e.g. the near integer rows of the tableau)
+        calls, found, accepted -- the calls, the cuts returned and the cuts that went through filter_cuts
+        max_violation, total_violation -- the largest and the sum of the violations of the cuts returned
+                                          (normalized by their largest coefficient)
+        time -- the milliseconds spent separating
+    '''
+    name = ""
+
+    def __init__(self):
+        self.info = {}
+        self.calls = 0
+        self.found = 0
+        self.accepted = 0
+        self.max_violation = 0.0
+        self.total_violation = 0.0
+        self.time = 0.0
+
+    def separate(self, lp, x):
+        '''
+        Arguments:
+            lp -- the LPBackend of the problem, solved to optimality
+            x -- the LP solution (problem variables only)
+        returns:
+            cuts, limits -- the cuts (shape = k * n, 1 * k)
+        '''
+        raise NotImplementedError
+
+    def run(self, lp, x):
+        '''
+        This function calls separate and updates the statistics of the separator.
+        '''
+        self.info = {}
+        with span(self.name) as separator_span:
+            cuts, limits = self.separate(lp, x)
+        cuts = np.asarray(cuts, dtype=np.float64).reshape(len(limits), len(x))
+        limits = np.asarray(limits, dtype=np.float64)
+        self.info["found"] = len(limits)
+        self.info["ms"] = round(separator_span.wall_ms, 3)
+        self.calls += 1
+        self.found += len(limits)
+        self.time += separator_span.wall_ms
+        if len(limits) > 0:
+            scale = np.abs(cuts).max(axis=1)
+            violation = (cuts @ x - limits) / np.where(scale > 0, scale, 1)
+            self.max_violation = max(self.max_violation, float(violation.max()))
+            self.total_violation += float(violation.sum())
+        return cuts, limits
+
+    def statistics(self):
+        '''
+        returns:
+            stats -- dictionary with the statistics of the separator (for the records)
+        '''
+        return {"calls": self.calls, "found": self.found, "accepted": self.accepted, "ms": round(self.time, 3),
+                "max_violation": self.max_violation, "mean_violation": self.total_violation / max(self.found, 1)}
+
+# Formulas of the Gomory cuts (GOMORY_FORMULA in config.ini)
+GOMORY_FORMULAS = ["gmi", "fractional"]
+
+class GomorySeparator(Separator):
+    '''
+    This class separates the Gomory cuts of the optimal tableau: the Gomory mixed integer cuts
+    (formula "gmi", see initialize_gmi_gc), or the fractional cuts of the raw tableau rows
+    (formula "fractional", see initialize_fract_gc), which ignore the nonbasic variables at their
+    upper bound and can cut off integer points.
+
+    Attributes:
+        tol -- the integrality tolerance
+        separation -- dictionary with the formula, the strategy, the number of rows and the rng of
+                      select_rows (read at every call: the strategy can change during the resolution)
+    '''
+    name = "gomory"
+
+    def __init__(self, tol=0.0, separation={}):
+        super().__init__()
+        self.tol = tol
+        self.separation = separation
+
+    def separate(self, lp, x):
+        with span("tableau") as tableau_span:
+            tableau = get_tableau(lp, self.tol)
+            gmi = self.separation.get("formula", "gmi") == "gmi"
+            if gmi:
+                tableau = tableau.complemented(lp.A.shape[1])
+        self.info["tableau_ms"] = round(tableau_span.wall_ms, 3)
+        # Rows that are fractional only because of the floating point noise
+        self.info["near_integer"] = int(np.count_nonzero(tableau.fractional_rows()) - np.count_nonzero(tableau.fractional_rows(self.tol)))
+        if gmi:
+            gc_lhs, gc_rhs = initialize_gmi_gc(tableau, lp.A.shape[1], self.tol, self.separation.get("strategy", "most_fractional"),
+                                               self.separation.get("rows", 0), self.separation.get("rng"))
+        else:
+            gc_lhs, gc_rhs = initialize_fract_gc(tableau, self.tol, self.separation.get("strategy", "most_fractional"),
+                                                 self.separation.get("rows", 0), self.separation.get("rng"))
+        cuts, limits, _ = generate_gc(lp.A, lp.b, gc_lhs, gc_rhs, tableau.varnames)
+        return cuts, limits
+
+class ZeroHalfSeparator(Separator):
+    '''
+    This class separates the {0,1/2}-Chvatal-Gomory cuts of Caprara and Fischetti (see zero_half_cuts)
+    from the integer rows of the model, cuts included.
+
+    Attributes:
+        max_cuts -- the maximum number of cuts of a call, the most violated ones (0 = all)
+        min_violation -- the minimum violation of a cut
+    '''
+    name = "zero_half"
+
+    def __init__(self, max_cuts=0, min_violation=0.0):
+        super().__init__()
+        self.max_cuts = max_cuts
+        self.min_violation = min_violation
+
+    def separate(self, lp, x):
+        return zero_half_cuts(lp.A, lp.b, x, self.max_cuts, self.min_violation)
+
+def zero_half_cuts(A, b, x, max_cuts=0, min_violation=0.0):
+    '''
+    This function separates {0,1/2}-cuts from the rows A x <= b with integer coefficients and
+    the bounds 0 <= x <= 1. Summing a set of rows (the ones with u_i = 1) and, for each odd column,
+    either x_j <= 1 or -x_j <= 0, gives an even row with an odd right hand side: half of it,
+    rounded down, is a valid cut. With the slacks s = b - A x of the rows, its violation is
+        (1 - u s - sum_j min(x_j, 1-x_j) over the odd columns) / 2
+    (one column switched to its more expensive bound when the right hand side is even).
+    Rows with a slack of 1 or more cannot give a violated cut; the others are reduced mod 2 and every
+    single row and every pair of rows is tried at once with vectorized operations.
+
+    Arguments:
+        A, b -- the rows of the model (the rows that are not integer are ignored)
+        x -- the LP solution (problem variables only)
+        max_cuts -- the maximum number of cuts, the most violated ones (0 = all)
+        min_violation -- the minimum violation of a cut (in the units of the cut divided by 2)
+    returns:
+        cuts, limits -- the violated cuts (shape = k * n, 1 * k)
+    '''
+    n = A.shape[1]
+    slacks = b - A @ x
+    integer = (np.abs(A - np.rint(A)) <= INTEGER_TOL).all(axis=1) & (np.abs(b - np.rint(b)) <= INTEGER_TOL)
+    rows = np.nonzero(integer & (slacks < 1 - INTEGER_TOL))[0]
+    if len(rows) == 0:
+        return np.zeros((0, n)), np.zeros(0)
+    parity = (np.rint(A[rows]).astype(np.int64) % 2).astype(bool)
+    rhs_parity = (np.rint(b[rows]).astype(np.int64) % 2).astype(bool)
+    slacks = np.maximum(slacks[rows], 0.0)
+    # Every single row and every pair of rows (u as the indexes of one or two rows)
+    first, second = np.triu_indices(len(rows))
+    combined = parity[first] ^ parity[second]
+    combined[first == second] = parity[first[first == second]]
+    odd_rhs = rhs_parity[first] ^ rhs_parity[second]
+    odd_rhs[first == second] = rhs_parity[first[first == second]]
+    u_slack = np.where(first == second, slacks[first], slacks[first] + slacks[second])
+    # Each odd column costs min(x_j, 1-x_j): x_j <= 1 is used when it is cheaper, and it flips the parity of the rhs
+    upper = 1 - x < x
+    cost = combined @ np.minimum(x, 1 - x)
+    flips = (combined & upper).sum(axis=1) % 2 == 1
+    even = ~(odd_rhs ^ flips)
+    # With an even rhs, the cheapest odd column switches bound
+    switch = np.where(combined, np.abs(1 - 2 * x), np.inf).min(axis=1)
+    cost = np.where(even, cost + switch, cost)
+    violation = (1 - u_slack - cost) / 2
+    candidates = np.nonzero(violation > max(min_violation, INTEGER_TOL))[0]
+    candidates = candidates[np.argsort(-violation[candidates], kind="stable")]
+    cuts, limits, seen = [], [], set()
+    for k in candidates:
+        i, j = rows[first[k]], rows[second[k]]
+        row = A[i] + A[j] if i != j else A[i].copy()
+        rhs = b[i] + b[j] if i != j else b[i]
+        odd = combined[k]
+        use_upper = odd & upper
+        if even[k]:
+            # The cheapest odd column uses the other bound
+            c = np.argmin(np.where(odd, np.abs(1 - 2 * x), np.inf))
+            use_upper[c] = not use_upper[c]
+        # x_j <= 1 for the columns in use_upper, -x_j <= 0 for the other odd columns
+        row = np.rint(row + np.where(use_upper, 1, np.where(odd, -1, 0)))
+        rhs = np.rint(rhs + np.count_nonzero(use_upper))
+        cut, limit = row / 2, np.floor(rhs / 2)
+        key = (cut.tobytes(), limit)
+        if key in seen:
+            continue
+        seen.add(key)
+        cuts.append(cut)
+        limits.append(limit)
+        if max_cuts > 0 and len(cuts) >= max_cuts:
+            break
+    if tracing(TABLEAU):
+        logging.info('*** ZERO-HALF CUTS ***\n')
+        for cut, limit in zip(cuts, limits):
+            logging.info("%s<= %s\n", " ".join(f'{cut[j]:+} x{j}' for j in np.nonzero(cut)[0]), limit)
+    return np.array(cuts).reshape(len(limits), n), np.array(limits)
+
+class CoverSeparator(Separator):
+    '''
+    This class separates the lifted cover inequalities of the knapsack rows of the model (see cover_cuts).
+
+    Attributes:
+        max_cuts -- the maximum number of cuts of a call, the most violated ones (0 = all)
+        min_violation -- the minimum violation of a cut
+    '''
+    name = "cover"
+
+    def __init__(self, max_cuts=0, min_violation=0.0):
+        super().__init__()
+        self.max_cuts = max_cuts
+        self.min_violation = min_violation
+
+    def separate(self, lp, x):
+        return cover_cuts(lp.A, lp.b, x, self.max_cuts, self.min_violation)
+
+def cover_cuts(A, b, x, max_cuts=0, min_violation=0.0):
+    '''
+    This function separates a lifted cover inequality from each knapsack row a x <= b (a >= 0) of
+    the model. The cover C is found greedily in O(n log n): the items are taken by increasing
+    (1 - x_j) / a_j until their weight exceeds b, then the ones with the smallest x_j are removed
+    while C stays a cover, so that it is minimal. The cover inequality sum_C x_j <= |C| - 1 is then
+    lifted with the sequence independent coefficients of Balas: with the weights of C sorted by
+    decreasing value and mu_h the sum of the h largest ones, an item out of C with
+    mu_h <= a_j < mu_(h+1) gets the coefficient h (every sequential lifting gives at least h).
+    The cuts are sparse: only C and the heavy items have a nonzero coefficient.
+
+    Arguments:
+        A, b -- the rows of the model (the rows with a negative coefficient are ignored)
+        x -- the LP solution (problem variables only)
+        max_cuts -- the maximum number of cuts, the most violated ones (0 = all)
+        min_violation -- the minimum violation of a cut
+    returns:
+        cuts, limits -- the violated cuts (shape = k * n, 1 * k)
+    '''
+    n = A.shape[1]
+    knapsack = (A >= 0).all(axis=1) & (b > 0) & (A.sum(axis=1) > b)
+    cuts, limits, violations = [], [], []
+    for i in np.nonzero(knapsack)[0]:
+        a, beta = A[i], b[i]
+        items = np.nonzero(a > 0)[0]
+        order = items[np.lexsort((-a[items], (1 - x[items]) / a[items]))]
+        k = np.searchsorted(np.cumsum(a[order]), beta, side="right")
+        cover = order[:k+1]
+        weight = a[cover].sum()
+        # Minimal cover: drop the items that contribute the least to the violation
+        for j in cover[np.argsort(x[cover], kind="stable")]:
+            if weight - a[j] > beta:
+                weight -= a[j]
+                cover = cover[cover != j]
+        cut = np.zeros(n)
+        cut[cover] = 1.0
+        mu = np.cumsum(np.sort(a[cover])[::-1])
+        others = np.setdiff1d(items, cover)
+        cut[others] = np.searchsorted(mu, a[others], side="right")
+        limit = len(cover) - 1.0
+        violation = cut @ x - limit
+        if violation > max(min_violation, INTEGER_TOL):
+            cuts.append(cut)
+            limits.append(limit)
+            violations.append(violation)
+    order = np.argsort(-np.array(violations), kind="stable")
+    if max_cuts > 0:
+        order = order[:max_cuts]
+    if tracing(TABLEAU):
+        logging.info('*** LIFTED COVER CUTS ***\n')
+        for k in order:
+            logging.info("%s<= %s\n", " ".join(f'{cuts[k][j]:+} x{j}' for j in np.nonzero(cuts[k])[0]), limits[k])
+    return np.array(cuts).reshape(len(limits), n)[order], np.array(limits)[order]
+
+class MIRSeparator(Separator):
+    '''
+    This class separates the complemented mixed integer rounding cuts of aggregations of rows
+    of the model (see mir_cuts).
+
+    Attributes:
+        max_cuts -- the maximum number of cuts of a call, the most efficacious ones (0 = all)
+        min_violation -- the minimum violation of a cut
+        aggregate_cuts -- True to aggregate also the cuts added to the LP, False for the model rows only
+        n_rows -- the number of model rows, read at the first call (before any cut is added)
+    '''
+    name = "mir"
+
+    def __init__(self, max_cuts=0, min_violation=0.0, aggregate_cuts=False):
+        super().__init__()
+        self.max_cuts = max_cuts
+        self.min_violation = min_violation
+        self.aggregate_cuts = aggregate_cuts
+        self.n_rows = None
+
+    def separate(self, lp, x):
+        if self.n_rows is None:
+            self.n_rows = lp.num_rows()
+        rows = lp.num_rows() if self.aggregate_cuts else self.n_rows
+        return mir_cuts(lp.A[:rows], lp.b[:rows], x, self.max_cuts, self.min_violation)
+
+def mir_cuts(A, b, x, max_cuts=0, min_violation=0.0):
+    '''
+    This function separates c-MIR cuts (Marchand and Wolsey) from the rows A x <= b and the bounds
+    0 <= x <= 1. The MIR_ROWS rows with the smallest slack at x, alone and summed in pairs sharing a
+    fractional variable, are the aggregated rows a x + s = beta (s >= 0, the sum of their slacks).
+    Bound substitution complements the variables closer to their upper bound (y_j = 1 - x_j), then
+    the row is divided by a scaling factor delta and rounded: with f the fractional part of beta/delta,
+        sum_j (floor(a_j/delta) + max(0, frac(a_j/delta) - f) / (1-f)) y_j <= floor(beta/delta)
+    is valid for y_j >= 0 integer, s being dropped. The factors are the MIR_DELTAS largest coefficients
+    of the fractional variables divided by MIR_DIVISORS: all of them are tried at once (aggregations *
+    factors * columns arrays) and only the most efficacious cut of each aggregation is kept.
+
+    Arguments:
+        A, b -- the rows of the model
+        x -- the LP solution (problem variables only)
+        max_cuts -- the maximum number of cuts, the most efficacious ones (0 = all)
+        min_violation -- the minimum violation of a cut
+    returns:
+        cuts, limits -- the violated cuts (shape = k * n, 1 * k)
+    '''
+    n = A.shape[1]
+    fractional = np.abs(x - np.rint(x)) > INTEGER_TOL
+    rows = np.argsort(b - A @ x, kind="stable")[:MIR_ROWS]
+    # Aggregations: every row, and every pair of rows with a common fractional variable
+    shared = (A[rows][:, fractional] != 0).astype(np.float64)
+    first, second = np.triu_indices(len(rows), 1)
+    pairs = (shared @ shared.T)[first, second] > 0
+    weights = np.zeros((len(rows)+np.count_nonzero(pairs), len(rows)))
+    weights[np.arange(len(rows)), np.arange(len(rows))] = 1.0
+    weights[len(rows)+np.arange(np.count_nonzero(pairs)), first[pairs]] = 1.0
+    weights[len(rows)+np.arange(np.count_nonzero(pairs)), second[pairs]] = 1.0
+    aggregated, beta = weights @ A[rows], weights @ b[rows]
+    # Bound substitution
+    upper = x > 0.5
+    coefs = np.where(upper, -aggregated, aggregated)
+    beta = beta - aggregated[:, upper].sum(axis=1)
+    # Scaling factors (0 where an aggregation has fewer fractional variables than MIR_DELTAS)
+    candidates = -np.sort(-np.abs(np.where(fractional, aggregated, 0.0)), axis=1)[:, :MIR_DELTAS]
+    deltas = (candidates[:, :, np.newaxis] / np.array(MIR_DIVISORS, dtype=np.float64)).reshape(len(beta), -1)
+    valid = deltas > INTEGER_TOL
+    deltas = np.where(valid, deltas, 1.0)
+    scaled, scaled_beta = coefs[:, np.newaxis, :] / deltas[:, :, np.newaxis], beta[:, np.newaxis] / deltas
+    f = scaled_beta - np.floor(scaled_beta)
+    valid &= (f > INTEGER_TOL) & (f < 1-INTEGER_TOL)
+    f = np.where(valid, f, 0.5)[:, :, np.newaxis]
+    rounded = np.floor(scaled) + np.maximum(scaled - np.floor(scaled) - f, 0.0) / (1-f)
+    # Back to the x_j, in the units of the aggregated row
+    rounded *= deltas[:, :, np.newaxis]
+    limits = np.floor(scaled_beta) * deltas - np.where(upper, rounded, 0.0).sum(axis=2)
+    cuts = np.where(upper, -rounded, rounded)
+    violations = cuts @ x - limits
+    norms = np.linalg.norm(cuts, axis=2)
+    efficacy = np.where(valid & (norms > 0), violations / np.where(norms > 0, norms, 1.0), -np.inf)
+    best = np.argmax(efficacy, axis=1)
+    aggregation = np.arange(len(beta))
+    cuts, limits = cuts[aggregation, best], limits[aggregation, best]
+    violations, efficacy = violations[aggregation, best], efficacy[aggregation, best]
+    keep = np.nonzero((efficacy > 0) & (violations > max(min_violation, INTEGER_TOL)))[0]
+    # The pairs can give the same cut as one of their rows
+    _, unique = np.unique(np.round(np.column_stack((cuts[keep], limits[keep])), 9), axis=0, return_index=True)
+    keep = keep[unique]
+    keep = keep[np.argsort(-efficacy[keep], kind="stable")]
+    if max_cuts > 0:
+        keep = keep[:max_cuts]
+    if tracing(TABLEAU):
+        logging.info('*** MIR CUTS ***\n')
+        for k in keep:
+            logging.info("%s<= %s\n", " ".join(f'{cuts[k, j]:+} x{j}' for j in np.nonzero(cuts[k])[0]), limits[k])
+    return cuts[keep].reshape(len(keep), n), limits[keep]
+
+# Available separators (SEPARATORS in config.ini)
+SEPARATORS = ["gomory", "zero_half", "cover", "mir"]
+
+def make_separators(names, tolerances={}, separation={}):
+    '''
+    This function creates the separators of an instance.
+
+    Arguments:
+        names -- list of SEPARATORS names, called in this order at every round
+        tolerances -- see iterateGomory
+        separation -- see iterateGomory, with also max_cuts, the maximum number of cuts of a round
+                      of each separator that does not read the tableau (0 = all), formula, one of
+                      GOMORY_FORMULAS, and aggregate_cuts, True if the MIR cuts aggregate also the cuts
+    '''
+    if separation.get("formula", "gmi") not in GOMORY_FORMULAS:
+        raise ValueError("Unknown Gomory formula '"+str(separation.get("formula"))+"', expected one of: "+", ".join(GOMORY_FORMULAS))
+    separators = []
+    for name in names:
+        if name == "gomory":
+            separators.append(GomorySeparator(tolerances.get("integrality", 0.0), separation))
+        elif name == "zero_half":
+            separators.append(ZeroHalfSeparator(separation.get("max_cuts", 0), tolerances.get("min_violation", 0.0)))
+        elif name == "cover":
+            separators.append(CoverSeparator(separation.get("max_cuts", 0), tolerances.get("min_violation", 0.0)))
+        elif name == "mir":
+            separators.append(MIRSeparator(separation.get("max_cuts", 0), tolerances.get("min_violation", 0.0),
+                                           separation.get("aggregate_cuts", False)))
+        else:
+            raise ValueError("Unknown separator '"+str(name)+"', expected one of: "+", ".join(SEPARATORS))
+    return separators
@@ -1,297 +1,343 @@
 from internals.general_utils import *
 from internals.solver_utils import *
-from configparser import ConfigParser
-import pandas as pd
+from internals.artifacts import ArtifactWriter
+from internals.instance_store import store
+from internals.lp_backend import make_backend
+from internals.cut_pool import CutPool
+from internals.profiling import span
+from internals.deadline import Deadline, TIME_LIMIT_STATUSES
+from internals.convergence import ConvergenceMonitor
+from internals.separators import make_separators
+import numpy as np
 import logging
-import cplex
-import datetime
 import os
 
 logging.basicConfig(filename='resolution.log', format='%(asctime)s - %(message)s',level=logging.INFO, datefmt='%d-%b-%y %H:%M:%S')
-columns=["name", "cluster_type", "nvar","nconstraints","optimal_sol","sol","sol_is_integer","status","ncuts","elapsed_time","gap","relative_gap","iterations"]
 
-def solveInstance(instance,cluster,stats):
-    logging.info("\n---------------------------------------------------")
-    logging.info("Solving problem instance '"+instance+"';\n")
-    stats_i = solveProblem("instances/"+cluster+"/"+instance,cluster)
-    return stats.append(pd.DataFrame(stats_i,columns=columns))
+def solveInstance(instance,cluster,stats,threads=0):
+    '''
+    This function solves an instance of the cluster and flushes its statistics rows
+    to the StatsCollector of the run.
+    '''
+    trace(SUMMARY, "\n---------------------------------------------------")
+    trace(SUMMARY, "Solving problem instance '%s';\n", instance)
+    stats_i = solveProblem("instances/"+cluster+"/"+instance,cluster,threads=threads)
+    stats.extend(stats_i)
+    stats.flush()
+    return stats
 
-def solveProblem(instance : str, cluster_type : str) :
+def solveProblem(instance : str, cluster_type : str, workdir : str = ".", threads : int = 0) :
     '''
-    This function solves a specific problem instance
+    This function solves a specific problem instance.
+    The LP model is built only once, with the LP_BACKEND of the configuration: every Gomory round
+    appends its cuts to the same model and re-optimizes it with the dual simplex, starting from
+    the previous optimal basis.
+    The instance has MAX_TIME_PER_INSTANCE milliseconds of wall clock time, started once the MIP
+    reference is known (the MIP has its own MIP_TIME_LIMIT): every solve gets the remaining time as
+    its time limit, and a round stops between its blocks of cuts once it is over.
+    A ConvergenceMonitor follows the bound: when it stalls over TAILING_OFF_WINDOW rounds the resolution
+    stops (or, with TAILING_OFF_ACTION = switch, goes on with the next separation strategy), and with
+    ADAPTIVE_CUTS the number of cuts of each round follows the gain of the previous one.
+    The stop_reason column of the statistics tells how the resolution ended: gap (THRESHOLD_GAP reached),
+    deadline, tailing_off, max_rounds (MAX_ROUNDS rounds done), no_cuts (no violated cut left) or infeasible.
     
     Arguments:
         instance
-        stats
+        cluster_type
+        workdir -- the directory of cplexEvents.log and of the CPLEX working files
+        threads -- the number of threads CPLEX can use (0 = CPLEX default)
     '''
-    # Retrieve the matrixes of the problem instance
-    c, A, b = getProblemData(instance) 
-    nCols, nRows =(len(c)), (len(b))
-
     # Get the instance name
-    txtname = instance.split("/")[2]    
-    name = txtname.split(".txt")[0]
-    if not os.path.exists("solutions/"+cluster_type+"/"+name):
-            os.makedirs("solutions/"+cluster_type+"/"+name)
-    if not os.path.exists("lp/"+cluster_type+"/"+name):
-            os.makedirs("lp/"+cluster_type+"/"+name)
-   
+    name = os.path.basename(instance).split(".txt")[0]
     path_base_log = str("solutions/"+cluster_type+"/"+name)
     path_base_lp = str("lp/"+cluster_type+"/"+name)
 
-    # Get config params
-    config = ConfigParser()
-    config.read('config.ini')
+    # Get config params (read once for the whole run)
+    config = store.get_config()
+    INSTANCE_CACHE=config[cluster_type].getboolean('INSTANCE_CACHE', False)
     MAX_TIME=int(config[cluster_type]['MAX_TIME_PER_INSTANCE'])
+    MAX_ROUNDS=config[cluster_type].getint('MAX_ROUNDS', 0)
+    CUT_MODE=config[cluster_type].get('CUT_MODE', 'round')
+    CUTS_PER_ROUND=config[cluster_type].getint('CUTS_PER_ROUND', 0)
+    MIP_TIME_LIMIT=config[cluster_type].getint('MIP_TIME_LIMIT', 0)
+    OPTIMAL_CACHE=config[cluster_type].getboolean('OPTIMAL_CACHE', False)
+    LP_BACKEND=config[cluster_type].get('LP_BACKEND', 'cplex')
+    CUT_MAX_AGE=config[cluster_type].getint('CUT_MAX_AGE', 0)
+    CUT_MAX_PARALLELISM=config[cluster_type].getfloat('CUT_MAX_PARALLELISM', 1.0)
+    CUT_MIN_EFFICACY=config[cluster_type].getfloat('CUT_MIN_EFFICACY', 0.0)
+    # Rows of the tableau used for the cuts and tolerances of the cut generation
+    separation = {"strategy": config[cluster_type].get('SEPARATION_STRATEGY', 'most_fractional'),
+                  "rows": config[cluster_type].getint('SEPARATION_ROWS', 0),
+                  "rng": np.random.default_rng(config[cluster_type].getint('SEPARATION_SEED', 0)),
+                  "max_cuts": config[cluster_type].getint('SEPARATOR_MAX_CUTS', 0),
+                  "formula": config[cluster_type].get('GOMORY_FORMULA', 'gmi'),
+                  "aggregate_cuts": config[cluster_type].getboolean('MIR_AGGREGATE_CUTS', False)}
+    tolerances = {"integrality": config[cluster_type].getfloat('INTEGRALITY_TOL', 0.0),
+                  "min_violation": config[cluster_type].getfloat('CUT_MIN_VIOLATION', 0.0),
+                  "max_dynamism": config[cluster_type].getfloat('CUT_MAX_DYNAMISM', 0.0),
+                  "max_denominator": config[cluster_type].getint('CUT_MAX_DENOMINATOR', 0)}
+    # The separators called at every round, in this order
+    separators = make_separators([separator.strip() for separator in config[cluster_type].get('SEPARATORS', 'gomory').split(",")],
+                                 tolerances, separation)
+    # Tailing off of the rounds and adaptive number of cuts per round
+    TAILING_OFF_ACTION=config[cluster_type].get('TAILING_OFF_ACTION', 'stop')
+    ADAPTIVE_CUTS=config[cluster_type].getboolean('ADAPTIVE_CUTS', False)
+    monitor = ConvergenceMonitor(config[cluster_type].getint('TAILING_OFF_WINDOW', 0),
+                                 config[cluster_type].getfloat('TAILING_OFF_EPS', 0.0),
+                                 config[cluster_type].getfloat('TAILING_OFF_RATE', 0.0),
+                                 config[cluster_type].getint('CUTS_PER_ROUND_MIN', 1),
+                                 config[cluster_type].getint('CUTS_PER_ROUND_MAX', 0))
     THRESHOLD_GAP = 0.05
+    # The .lp/.log artifacts are written by a background thread, out of the timings
+    writer = ArtifactWriter(config[cluster_type].get('ARTIFACTS', 'round'),
+                            config[cluster_type].getboolean('ARTIFACT_COMPRESS', False),
+                            int(config[cluster_type].getfloat('ARTIFACT_BUDGET_MB', 0) * 1024 * 1024))
 
-    #Program variables section ####################################################
-    names, lower_bounds, upper_bounds,constraint_senses,constraint_names =initializeInstanceVariables(nCols,nRows) 
+    with span("instance", instance=name, cluster=cluster_type):
+        # Retrieve the matrixes of the problem instance
+        c, A, b = store.get_problem(instance, INSTANCE_CACHE)
+        nCols, nRows =(len(c)), (len(b))
 
-    nCols= nCols+nRows
+        # Populate statistics 
+        tot_stats=[]
+        # The cuts of the instance: every round sends the best CUTS_PER_ROUND of them to the LP
+        pool = CutPool(nRows, CUT_MAX_AGE, CUT_MAX_PARALLELISM, CUT_MIN_EFFICACY)
 
-    # Populate statistics 
-    tot_stats=[]
+        # Solver section    ############################################################
 
-    # Solver section    ############################################################
+        with open(os.path.join(workdir,"cplexEvents.log"), "w") as f:
+            lp = make_backend(LP_BACKEND, name, f, workdir, threads)
 
-    #First of all determine the optimal solution
-    optimal_sol=determineOptimal(instance,cluster_type)
-    
-     
-    with cplex.Cplex() as mkp,  open("cplexEvents.log", "w") as f:
-        
-        # set MKP
-        mkp.set_problem_name(name)
-        mkp.objective.set_sense(mkp.objective.sense.maximize)
-        mkp.set_log_stream(f)
-        mkp.set_error_stream(f)
-        mkp.set_warning_stream(f)
-        mkp.set_results_stream(f)
-        params = mkp.parameters
-        # Disable presolve 
-        params.preprocessing.presolve.set(0) 
-        params.preprocessing.linear.set(0)
-        params.preprocessing.reduce.set(0)
- 
-        
-        # Add variables & Slack --------------------------------------------------------------------
-        mkp.variables.add(names=names)
-        # Add variables 
-        for i in range(nCols-nRows):
-            mkp.variables.set_lower_bounds(i, lower_bounds[i])
-            mkp.variables.set_upper_bounds(i, upper_bounds[i])
-        # Add slack
-        for i in range(nCols-nRows,nCols):
-            mkp.variables.set_lower_bounds(i, lower_bounds[i])
-        #Add slack to constraints
-        A = A.tolist()
-        for row in range(nRows) :
-            for slack in range(nRows) : 
-                if row==slack : 
-                    A[row].append(1)
-                else :
-                    A[row].append(0)
-    
-        # Add contraints to Cplex ------------------------------------------------------------------
-        for i in range(nRows):
-            mkp.linear_constraints.add(lin_expr= [cplex.SparsePair(ind= [j for j in range(nCols)], val= A[i])], rhs= [b[i]], names = [constraint_names[i]], senses = [constraint_senses[i]])
-        # Add objective function -----------------------------------------------------------
-        for i in range(nCols-nRows): 
-            mkp.objective.set_linear([(i, c[i])])
+            #First of all determine the optimal solution
+            optimal_sol=determineOptimal(instance,cluster_type,lp,writer,(c, A, b),MIP_TIME_LIMIT,OPTIMAL_CACHE)
+            # The time budget of the cuts, started once the reference is known (bounded by MIP_TIME_LIMIT
+            # on its own), so that it does not depend on a hit of the optimal cache
+            deadline = Deadline(MAX_TIME)
 
-        # Total time
-        total_time = 0.0
-        ###########################################
-        # Start time for first iteration
-        start_iteration_time = datetime.datetime.now()
-        # Resolve the problem instance with 0 cuts
-        mkp.solve()
-        # Report the results with 0 cut
-        logging.info("\n\t\t\t\t\t\t*** RELAXED PL SOLUTION (UPPER BOUND) ***")
-        sol, sol_type,status = print_solution(mkp)
-        if not os.path.exists(path_base_log+"/iteration0"):
-            os.makedirs(path_base_log+"/iteration0")
-        if not os.path.exists(path_base_lp+"/iteration0"):
-            os.makedirs(path_base_lp+"/iteration0")
-        mkp.write(path_base_lp+"/iteration0/0_cut.lp")
-        mkp.solution.write(path_base_log+"/iteration0/0_cut.log")
-        elapsed_time = (datetime.datetime.now()-start_iteration_time).total_seconds() * 1000
-        logging.info("Iteration time: %s Milliseconds", elapsed_time)
-        #Append to statistics with 0 cuts
-        tot_stats.append(getStatistics(name,cluster_type,nCols-nRows,nRows,optimal_sol,sol,sol_type,status,0,elapsed_time,0))
-        
-        # Generate gormory cuts
-        n_cuts, b_bar = get_tableau(mkp)
-        gc_lhs, gc_rhs = initialize_fract_gc(n_cuts, nCols, mkp, names,b_bar)
-        cuts, cut_limits, cut_senses=generate_gc(mkp, A, gc_lhs, gc_rhs, names)
-        
-        # Add the cuts sequentially and solve the problem (without slack variables)
-        break_before = 0
+            # Build the model once, it will be kept alive for all the Gomory rounds
+            with span("build") as build_span:
+                lp.build(c, A, b)
+            build_time = build_span.wall_ms
 
-        # Start time for first iteration
-        start_iteration_time = datetime.datetime.now()
-        for i in range(len(cuts)):
-            mkp.linear_constraints.add(
-                lin_expr= [cplex.SparsePair(ind= [j for j in range(nCols-nRows)], val= cuts[i])], 
-                senses= [cut_senses[i]], 
-                rhs= [cut_limits[i]],
-                names = ["cut_"+str(i+1)])
-            mkp.set_problem_name(name+"_cut_n"+str(i+1))
-            logging.info("\n\t\t\t\t\t Resolution of the problem called '"+name+"': "+str(i+1)+" Gomory cuts applied.")
-            mkp.solve()
-            elapsed_time = (datetime.datetime.now()-start_iteration_time).total_seconds() * 1000
-            sol,sol_type,status=print_solution(mkp)
-            if status=='infeasible':
-                break_before= 1
-                break
-            tot_stats.append(getStatistics(name,cluster_type,nCols-nRows,(nRows+len(cuts)),optimal_sol,sol,sol_type,status,i+1,elapsed_time,1))
-            if not os.path.exists(path_base_lp+"/iteration1"):
-                os.makedirs(path_base_lp+"/iteration1")
-            if not os.path.exists(path_base_log+"/iteration1"):
-                os.makedirs(path_base_log+"/iteration1")
-            mkp.write(path_base_lp+"/iteration1/"+str(i+1)+"_cut.lp")
-            mkp.solution.write(path_base_log+"/iteration1/"+str(i+1)+"_cut.log")
-            
-        iteration_time = (datetime.datetime.now()-start_iteration_time).total_seconds() * 1000
-        total_time += iteration_time
-        logging.info("Iteration time: %s Milliseconds", iteration_time)
-        mkp.end()
-        pass
+            # Total time
+            total_time = 0.0
+            ###########################################
+            with span("round", round=0) as round_span:
+                # Resolve the problem instance with 0 cuts
+                with span("solve") as solve_span:
+                    lp.set_time_limit(deadline.time_limit())
+                    lp.solve()
+                solve_time = solve_span.wall_ms
+                # Report the results with 0 cut
+                trace(ROUND, "\n\t\t\t\t\t\t*** RELAXED PL SOLUTION (UPPER BOUND) ***")
+                sol, sol_type,status = print_solution(lp)
+            elapsed_time = round_span.wall_ms
+            writer.write_model("round", lp.artifacts, path_base_lp+"/iteration0/0_cut.lp", path_base_log+"/iteration0/0_cut.log")
+            trace(ROUND, "Iteration time: %s Milliseconds", elapsed_time)
+            trace(ROUND, "Round 0 -> build time: %s Milliseconds, solve time: %s Milliseconds", build_time, solve_time)
+            record(ROUND, "round", instance=name, cluster=cluster_type, round=0, ncuts=0, bound=sol, gap=relativeGap(sol,optimal_sol),
+                   build_ms=round(build_time,3), solve_ms=round(solve_time,3), round_ms=round(elapsed_time,3))
+            #Append to statistics with 0 cuts
+            tot_stats.append(getStatistics(name,cluster_type,nCols,nRows,optimal_sol,sol,sol_type,status,0,elapsed_time,0,build_time,solve_time))
+            monitor.update(0.0, sol)
 
-    if break_before== 1 : 
-            return tot_stats
+            iteration = 0
+            tailing_off = False
+            strategies = [separation["strategy"]]
+            n_applied = 0
+            rel_gap=9999999999999999.0
+            while (not deadline.expired() and rel_gap>THRESHOLD_GAP and status=="optimal" and (MAX_ROUNDS <= 0 or iteration < MAX_ROUNDS)) :
+                start_snapshot_time = writer.snapshot_time
+                iteration += 1
+                old_applied = n_applied
+                with span("round", round=iteration) as round_span:
+                    sol,sol_type,status,n_applied,tot_stats= iterateGomory(lp,name,cluster_type,n_applied,tot_stats,optimal_sol,iteration,writer,pool,CUT_MODE,CUTS_PER_ROUND,tolerances,separators,deadline)
+                rel_gap = relativeGap(sol,optimal_sol)
+                # Get new time (without the artifacts snapshots)
+                iteration_time = round_span.wall_ms - (writer.snapshot_time-start_snapshot_time)
+                total_time = total_time + iteration_time
+                trace(ROUND, "Iteration time: %s Milliseconds", iteration_time)
+                # No cut left to add: the model would not change anymore
+                if n_applied == old_applied:
+                    break
+                monitor.update(total_time, sol, n_applied-old_applied)
+                if ADAPTIVE_CUTS:
+                    CUTS_PER_ROUND = monitor.next_cuts(CUTS_PER_ROUND)
+                if monitor.tailing_off():
+                    # Without a row limit every fractional row is used whatever the strategy: switching gives the same cuts
+                    untried = [strategy for strategy in SEPARATION_STRATEGIES if strategy not in strategies] if separation["rows"] > 0 else []
+                    if TAILING_OFF_ACTION != "switch" or len(untried) == 0:
+                        trace(ROUND, "Tailing off: bound improved by %s over the last %d rounds", monitor.improvement(monitor.window), monitor.window)
+                        tailing_off = True
+                        break
+                    trace(ROUND, "Tailing off: separation strategy %s -> %s", separation["strategy"], untried[0])
+                    separation["strategy"] = untried[0]
+                    strategies.append(untried[0])
+                    monitor.restart()
+            writer.write_model("final", lp.artifacts, path_base_lp+"/final.lp", path_base_log+"/final.log")
+            lp.close()
+        writer.close()
+        stop_reason = stopReason(status, relativeGap(sol,optimal_sol), THRESHOLD_GAP, deadline, tailing_off,
+                                 MAX_ROUNDS > 0 and iteration >= MAX_ROUNDS and n_applied > old_applied)
+        for row in tot_stats:
+            row[columns.index("stop_reason")] = stop_reason
 
-    iteration = 1
-    rel_gap=9999999999999999.0
-    sol_type="optimal"
-    c=0
-    while (total_time <= MAX_TIME and rel_gap>THRESHOLD_GAP and status=="optimal") :
-        start_iteration_time = datetime.datetime.now()
-        iteration += 1
-        old_sol = sol
-        sol,sol_type,status,cuts,cut_limits, tot_stats= iterateGomory(name,cluster_type,instance,cuts,cut_limits,tot_stats,optimal_sol,iteration)
-        if sol == old_sol:
-            c+=1;
-        if(optimal_sol==0):
-            rel_gap = 1
-        else:
-            rel_gap = modulus(sol,optimal_sol)/(optimal_sol+pow(10,-10))
-        # Get new time
-        iteration_time = (datetime.datetime.now()-start_iteration_time).total_seconds() * 1000
-        total_time = total_time + iteration_time
-        logging.info("Iteration time: %s Milliseconds", iteration_time)
-
-
-    logging.info("Total time: %s Milliseconds", total_time)
+    trace(SUMMARY, "Total time: %s Milliseconds, stop reason: %s", total_time, stop_reason)
+    record(SUMMARY, "instance", instance=name, cluster=cluster_type, rounds=iteration, ncuts=n_applied, bound=sol,
+           optimal_sol=optimal_sol, gap=relativeGap(sol,optimal_sol), status=status, stop_reason=stop_reason,
+           total_ms=round(total_time,3), wall_ms=round(deadline.elapsed_ms(),3),
+           artifact_bytes=writer.written, artifact_dropped=writer.dropped,
+           duplicate_cuts=pool.duplicates, purged_cuts=pool.purged, dropped_cuts=pool.dropped,
+           separators={separator.name: separator.statistics() for separator in separators},
+           strategies=strategies, trajectory=[[round(ms,3), bound, cuts] for ms, bound, cuts in monitor.trajectory])
     return tot_stats
 
-def iterateGomory(name,cluster_type,instance,cuts,cut_limits,tot_stats, optimal_sol, iteration):
-    '''
-    This function solves a  gomory iteration's algorithm
+def iterateGomory(lp,name,cluster_type,n_applied,tot_stats, optimal_sol, iteration, writer, pool, cut_mode="round", cuts_per_round=0, tolerances={}, separators=None, deadline=None):
     '''
+    This function solves a gomory iteration's algorithm on the persistent model:
+    every separator generates its cuts from the current optimal solution (the Gomory one from the
+    tableau), they are filtered and added to the cut pool, the best ones are appended to the model,
+    which is then warm started from the previous basis.
+    At the end of the round, the cuts that have been non binding for too long leave the model.
+    In "round" mode all the cuts of the round are added at once and the model is solved once;
+    in "cut" mode the cuts are added and solved one at a time (useful to analyse each cut).
+    When the deadline is over, the round stops before its next block and the cuts left go back to the pool.
     
-    c, A, b = getProblemData(instance)
-    newA = A.tolist()
-    newB = b.tolist()
-    for i in range(len(cuts)):
-        newA.append(cuts[i])
-        newB.append(cut_limits[i]) 
-    
-    A = np.asarray(newA,dtype=np.float64)
-    b = np.asarray(newB,dtype=np.float64)
-
-    nCols, nRows =(len(c)), (len(b))
-    
-    # Get the instance name
+    Arguments:
+        lp -- the LPBackend of the problem, already solved
+        name, cluster_type -- the instance name and cluster
+        n_applied -- the number of cuts already in the model
+        tot_stats, optimal_sol, iteration
+        writer -- the ArtifactWriter of the instance
+        pool -- the CutPool of the instance
+        cut_mode -- "round" or "cut"
+        cuts_per_round -- maximum number of cuts added in the round (0 = all the violated ones)
+        tolerances -- dictionary with the integrality tolerance and the min_violation, max_dynamism
+                      and max_denominator of filter_cuts (missing = exact tests, no filter)
+        separators -- the Separator list of the instance (None = the Gomory cuts of all the fractional rows)
+        deadline -- the Deadline of the instance (None = no time limit)
+    returns:
+        sol,sol_type,status,n_applied,tot_stats
+    '''
     path_base_log = str("solutions/"+cluster_type+"/"+name)
     path_base_lp = str("lp/"+cluster_type+"/"+name)
+    path_lp = path_base_lp+"/iteration"+str(iteration)+"/"
+    path_log = path_base_log+"/iteration"+str(iteration)+"/"
 
-    if not os.path.exists(path_base_log+"/iteration"+str(iteration)):
-                os.makedirs(path_base_log+"/iteration"+str(iteration))
-    if not os.path.exists(path_base_lp+"/iteration"+str(iteration)):
-                os.makedirs(path_base_lp+"/iteration"+str(iteration))
-
-    #Program variables section ####################################################
-    names, lower_bounds, upper_bounds,constraint_senses,constraint_names =initializeInstanceVariables(nCols,nRows) 
-    nCols= nCols+nRows
+    # The model already holds the optimal solution of the previous round
+    sol = lp.objective_value()
+    sol_type = sol.is_integer()
+    status = lp.status()
+    ########################################################################
+    x = lp.values()[:lp.A.shape[1]]
+    if separators is None:
+        separators = make_separators(["gomory"], tolerances)
+    with span("separation"):
+        new_cuts, new_cut_limits = [np.zeros((0, len(x)))], [np.zeros(0)]
+        rejected = {"dynamism": 0, "violation": 0}
+        n_generated, rationalized = 0, 0
+        for separator in separators:
+            cuts, limits = separator.run(lp, x)
+            n_generated += len(limits)
+            with span("filter"):
+                cuts, limits, rejected_s, rationalized_s = filter_cuts(cuts, limits, x, tolerances.get("min_violation", 0.0),
+                                                                       tolerances.get("max_dynamism", 0.0), tolerances.get("max_denominator", 0))
+            separator.accepted += len(limits)
+            separator.info["accepted"] = len(limits)
+            rationalized += rationalized_s
+            for reason in rejected:
+                rejected[reason] += rejected_s[reason]
+            new_cuts.append(cuts)
+            new_cut_limits.append(limits)
+        new_cuts, new_cut_limits = np.vstack(new_cuts), np.concatenate(new_cut_limits)
+        # Rows of the tableau that are fractional only because of the floating point noise
+        near_integer = sum(separator.info.get("near_integer", 0) for separator in separators)
+        with span("pool"):
+            n_new = pool.add(new_cuts, new_cut_limits)
+            new_cuts, new_cut_limits = pool.select(x, cuts_per_round)
+    # Blocks of cuts added before each solve
+    if cut_mode == "cut":
+        blocks = [(i, i+1) for i in range(len(new_cuts))]
+    else:
+        blocks = [(0, len(new_cuts))] if len(new_cuts) > 0 else []
+    if deadline is None:
+        deadline = Deadline()
+    start_snapshot_time = writer.snapshot_time
+    start_applied = n_applied
+    round_build_time, round_solve_time = 0.0, 0.0
+    with span("resolve") as resolve_span:
+        for first, last in blocks:
+            if deadline.expired():
+                trace(ROUND, "Deadline reached: %d cuts of the round not added", len(new_cuts)-first)
+                pool.unselect(len(new_cuts)-first)
+                break
+            with span("cut", cuts=last-first):
+                with span("add_rows") as build_span:
+                    lp.add_rows(new_cuts[first:last], new_cut_limits[first:last], ["cut_"+str(n_applied+1+k) for k in range(last-first)])
+                build_time = build_span.wall_ms
+                n_applied += last-first
+                lp.set_name(name+"_cut_n"+str(n_applied))
+                trace(ROUND, "\n\t\t\t\t\t Resolution of the problem called '%s': %d Gomory cuts applied.", name, n_applied)
+                with span("solve") as solve_span:
+                    lp.set_time_limit(deadline.time_limit())
+                    lp.solve()
+                solve_time = solve_span.wall_ms
+                round_build_time += build_time
+                round_solve_time += solve_time
+                sol,sol_type,status=print_solution(lp)
+                elapsed_time = resolve_span.elapsed_ms() - (writer.snapshot_time-start_snapshot_time)
+                tot_stats.append(getStatistics(name,cluster_type,lp.A.shape[1],lp.num_rows(),optimal_sol,sol,sol_type,status,n_applied,elapsed_time,iteration,build_time,solve_time))
+                # The model at the end of the round is a "round" artifact, the ones in between are "cut" artifacts
+                end_of_round = last == len(new_cuts) or status!='optimal'
+                writer.write_model("round" if end_of_round else "cut", lp.artifacts, path_lp+str(last)+"_cut.lp", path_log+str(last)+"_cut.log")
+            if status!='optimal':
+                pool.unselect(len(new_cuts)-last)
+                break
+        # Remove the cuts that have been non binding for too long (the solution does not change)
+        n_purged = 0
+        if status=='optimal' and len(blocks) > 0:
+            with span("purge"):
+                rows = pool.purge(lp.values()[lp.A.shape[1]+pool.n_rows:])
+                if len(rows) > 0:
+                    with span("remove_rows") as build_span:
+                        lp.remove_rows(rows)
+                    round_build_time += build_span.wall_ms
+                    with span("solve") as solve_span:
+                        lp.set_time_limit(deadline.time_limit())
+                        lp.solve()
+                    round_solve_time += solve_span.wall_ms
+                    status = lp.status()
+                    n_purged = len(rows)
+    trace(ROUND, "Round %d -> %d cuts (%d generated, %d near integer rows, %d rejected, %d new in the pool, %d removed from the model), build time: %s Milliseconds, solve time: %s Milliseconds",
+          iteration, n_applied-start_applied, n_generated, near_integer, sum(rejected.values()), n_new, n_purged, round_build_time, round_solve_time)
+    record(ROUND, "round", instance=name, cluster=cluster_type, round=iteration, ncuts=n_applied-start_applied, bound=sol, gap=relativeGap(sol,optimal_sol),
+           generated=n_generated, rejected_integrality=near_integer, rejected_dynamism=rejected["dynamism"], rejected_violation=rejected["violation"],
+           rationalized=rationalized, pooled=n_new, purged=n_purged, rows=lp.num_rows(),
+           separators={separator.name: separator.info for separator in separators},
+           build_ms=round(round_build_time,3), solve_ms=round(round_solve_time,3),
+           round_ms=round(resolve_span.wall_ms - (writer.snapshot_time-start_snapshot_time),3))
 
-    # Populate statistics 
-    n_cuts = len(cuts)
-    with cplex.Cplex() as mkp,  open("cplexEvents.log", "w") as f:
-        # set mkp
-        mkp.set_problem_name(name)
-        mkp.objective.set_sense(mkp.objective.sense.maximize)
-        mkp.set_log_stream(f)
-        mkp.set_error_stream(f)
-        mkp.set_warning_stream(f)
-        mkp.set_results_stream(f)
-        params = mkp.parameters
-        # Disable presolve 
-        params.preprocessing.presolve.set(0) 
-        params.preprocessing.linear.set(0)
-        params.preprocessing.reduce.set(0)
-        
-        # Add variables & Slack --------------------------------------------------------------------
-        mkp.variables.add(names=names)
-        # Add variables 
-        for i in range(nCols-nRows):
-            mkp.variables.set_lower_bounds(i, lower_bounds[i])
-            mkp.variables.set_upper_bounds(i, upper_bounds[i])
-        # Add slack
-        for i in range(nCols-nRows,nCols):
-            mkp.variables.set_lower_bounds(i, lower_bounds[i])
-        #Add slack to constraints
-        A = A.tolist()
-        for row in range(nRows) :
-            for slack in range(nRows) : 
-                if row==slack : 
-                    A[row].append(1)
-                else :
-                    A[row].append(0)
-    
-        # Add contraints to Cplex ------------------------------------------------------------------
-        for i in range(nRows):
-            mkp.linear_constraints.add(lin_expr= [cplex.SparsePair(ind= [j for j in range(nCols)], val= A[i])], rhs= [b[i]], names = [constraint_names[i]], senses = [constraint_senses[i]])
-        # Add objective function -----------------------------------------------------------
-        for i in range(nCols-nRows): 
-            mkp.objective.set_linear([(i, c[i])])
-        # solve mkp with 0 cuts
-        mkp.solve()
-        # get solution with 0 cuts
-        sol, sol_type,status = print_solution(mkp)
-        mkp.write(path_base_lp+"/iteration"+str(iteration)+"/0_cut.lp")
-        mkp.solution.write(path_base_log+"/iteration"+str(iteration)+"/0_cut.log")
-        ########################################################################
-        n_cuts, b_bar = get_tableau(mkp)
-        gc_lhs, gc_rhs = initialize_fract_gc(n_cuts, nCols, mkp, names,b_bar)
-        new_cuts, new_cut_limits, new_cut_senses=generate_gc(mkp, A, gc_lhs, gc_rhs, names)
-        # start ime
-        start_iteration_time = datetime.datetime.now()
-        # Add the cuts sequentially and solve the problem (without slack variables)
-        for i in range(len(new_cuts)):
-            mkp.linear_constraints.add(
-                lin_expr= [cplex.SparsePair(ind= [j for j in range(nCols-nRows)], val= new_cuts[i])], 
-                senses= [new_cut_senses[i]], 
-                rhs= [new_cut_limits[i]],
-                names = ["cut_"+str(i+1)])
-            mkp.set_problem_name(name+"_cut_n"+str(i+1))
-            logging.info("\n\t\t\t\t\t Resolution of the problem called '"+name+"': "+str(i+1)+" Gomory cuts applied.")
-            mkp.solve()
-            sol,sol_type,status=print_solution(mkp)
-            elapsed_time = (datetime.datetime.now()-start_iteration_time).total_seconds() * 1000
-            tot_stats.append(getStatistics(name,cluster_type,nCols-nRows,(nRows+len(cuts)),optimal_sol,sol,sol_type,status,n_cuts+i+1,elapsed_time,iteration))
-            mkp.write(path_base_lp+"/iteration"+str(iteration)+"/"+str(i+1)+"_cut.lp")
-            mkp.solution.write(path_base_log+"/iteration"+str(iteration)+"/"+str(i+1)+"_cut.log")
-            
-        for cut in new_cuts:
-            cuts.append(cut)
-        for cut_lim in new_cut_limits:
-            cut_limits.append(cut_lim)
+    return sol,sol_type,status,n_applied,tot_stats
 
-        sol,sol_type,status=print_solution(mkp)
-        ########################################################################à
-        mkp.end()
-        pass
+def stopReason(status, rel_gap, threshold_gap, deadline, tailing_off=False, max_rounds=False):
+    '''
+    This function tells why the Gomory rounds of an instance ended.
 
-    return sol,sol_type,status,cuts,cut_limits,tot_stats
\ No newline at end of file
+    returns:
+        reason -- "deadline" (time budget over), "gap" (threshold_gap reached), "tailing_off" (the bound
+                  stalled), "max_rounds" (MAX_ROUNDS done), "no_cuts" (no violated cut left to add), or
+                  the status of the LP when it is not optimal (e.g. "infeasible")
+    '''
+    if status in TIME_LIMIT_STATUSES:
+        return "deadline"
+    if status != "optimal":
+        return status
+    if rel_gap <= threshold_gap:
+        return "gap"
+    if deadline.reached:
+        return "deadline"
+    if tailing_off:
+        return "tailing_off"
+    if max_rounds:
+        return "max_rounds"
+    return "no_cuts"
@@ -3,110 +3,261 @@ from typing import Tuple
 import numpy as np
 import fractions
 import logging
-import cplex
 import io
+import os
+from internals.tracing import *
+from internals.profiling import span
+from internals.optimal_cache import instance_key, load_optimal, save_optimal
 
-columns=["name", "cluster_type", "nvar","nconstraints","optimal_sol","sol","sol_is_integer","status","ncuts","elapsed_time","gap","relative_gap","iterations"]
+columns=["name", "cluster_type", "nvar","nconstraints","optimal_sol","sol","sol_is_integer","status","ncuts","elapsed_time","gap","relative_gap","iterations","build_time","solve_time","stop_reason"]
 
 logging.basicConfig(filename='resolution.log', format='%(asctime)s - %(message)s',level=logging.INFO, datefmt='%d-%b-%y %H:%M:%S')
 
-def getProblemData(name: str) -> Tuple:
+# Layout of the binary sidecar of an instance: a single float64 array with the header
+# [version, size of the .txt, mtime of the .txt, n, m] followed by c, A (row major) and b
+SIDECAR_VERSION = 1.0
+SIDECAR_HEADER = 5
+
+def getProblemData(name: str, sidecar: bool = False) -> Tuple:
     '''
     This function extracts the raw data from a .txt file and populates the objective function coefficients
-    array, the constraints coefficients matrix A and the right hand side b array
+    array, the constraints coefficients matrix A and the right hand side b array.
+    The file is converted in bulk by NumPy, in linear time. With sidecar=True the parsed data is
+    also saved in cache/<name>.npy and, as long as the .txt keeps the same size and modification
+    time, later calls memory-map it instead of parsing the text again.
     
     Arguments:
         name -- the name of the .txt file that contains the raw data
+        sidecar -- use (and write) the binary sidecar of the file
         
     returns:
         c -- objective function coefficients array (shape = 1 * n)
         A -- constraints coefficients matrix A (shape = m * n)
         b -- right hand side values (shape = 1 * m)
     '''
-    # Opening .txt file in order to read the raw data of a problem instance
-    file = open(str(name), 'r')
-    x = []
-    for line in file:
-        splitLine = line.split()
-        for i in range(len(splitLine)):
-            x.append(splitLine[i])
-    file.close()
-    
+    stat = os.stat(str(name))
+    sidecar_path = os.path.join("cache", str(name)+".npy")
+    data = None
+    with span("parse", sidecar=sidecar):
+        if sidecar:
+            data = load_sidecar(sidecar_path, stat)
+        if data is None:
+            # Opening .txt file in order to read the raw data of a problem instance
+            with open(str(name), 'rb') as file:
+                x = np.array(file.read().split(), dtype=np.float64)
+            NumColumns, NumRows = int(x[0]), int(x[1])
+            assert len(x) == 2 + NumColumns + NumRows*NumColumns + NumRows
+            data = np.concatenate(([SIDECAR_VERSION, stat.st_size, stat.st_mtime], x))
+            if sidecar:
+                save_sidecar(sidecar_path, data)
+
     # Define parameters
-    NumColumns, NumRows = int(x.pop(0)), int(x.pop(0))
-    logging.info('This instance has %d variables and %d constraints' %(NumColumns, NumRows))
+    NumColumns, NumRows = int(data[3]), int(data[4])
+    trace(SUMMARY, 'This instance has %d variables and %d constraints', NumColumns, NumRows)
+    start = SIDECAR_HEADER
 
     # Populating Objective Function Coefficients
-    c = np.array([float(x.pop(0)) for i in range(NumColumns)])
-    assert type(c) == np.ndarray
+    c = data[start:start+NumColumns]
     assert len(c)  == NumColumns
+    start += NumColumns
     
     # Populating A matrix (size NumRows * NumColumns)
-    ConstCoef = np.array([float(x.pop(0)) for i in range(int(NumRows * NumColumns))])    
-    assert type(ConstCoef) == np.ndarray
-    assert len(ConstCoef)  == int(NumRows*NumColumns)
-    
-    # reshaping the 1-d ConstCoef into A
-    A = np.reshape(ConstCoef, (NumRows, NumColumns)) 
+    A = np.reshape(data[start:start+NumRows*NumColumns], (NumRows, NumColumns)) 
     assert A.shape == (NumRows, NumColumns)
+    start += NumRows*NumColumns
     
     # Populating the RHS
-    b = np.array([float(x.pop(0)) for i in range(int(NumRows))])
+    b = data[start:start+NumRows]
     assert len(b) == NumRows
-    assert type(b) == np.ndarray
     return (c, A, b)
 
-def get_tableau(prob):
+def load_sidecar(path, stat):
+    '''
+    This function memory-maps the sidecar of an instance (no copy is made) if it is still valid
+    for the .txt file with the given os.stat.
+    
+    returns:
+        data -- the sidecar array, or None if it is missing or stale
+    '''
+    try:
+        data = np.load(path, mmap_mode='r').view(np.ndarray)
+    except (OSError, ValueError):
+        return None
+    if (data.ndim != 1 or len(data) < SIDECAR_HEADER or data[0] != SIDECAR_VERSION
+            or data[1] != stat.st_size or data[2] != stat.st_mtime):
+        return None
+    if len(data) != SIDECAR_HEADER + int(data[3]) + int(data[3])*int(data[4]) + int(data[4]):
+        return None
+    return data
+
+def save_sidecar(path, data):
     '''
-    This function get the final tableau of the prob (cplex.Cplex())
+    This function writes the sidecar of an instance atomically (other processes may be reading it).
+    '''
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path+"."+str(os.getpid())+".tmp"
+    with open(tmp_path, 'wb') as file:
+        np.save(file, data)
+    os.replace(tmp_path, path)
+
+# Basis status of a column (the values of the CPLEX basis status)
+AT_LOWER, BASIC, AT_UPPER = 0, 1, 2
+
+class TableauSnapshot:
+    '''
+    This class holds the final tableau of an LP backend, extracted once per round.
+    
+    Attributes:
+        BinvA -- the tableau rows B^-1 A (shape = m * ncol)
+        Binv -- the basis inverse B^-1 (shape = m * m)
+        b -- right hand side values (shape = 1 * m)
+        b_bar -- the values of the basic variables B^-1 b (shape = 1 * m), exact only when
+                 no nonbasic column is at its upper bound (see complemented)
+        varnames -- the names of the columns
+        status -- the basis status of the columns, AT_LOWER, BASIC or AT_UPPER (None if unknown)
+        integer_rows -- the mask of the rows whose basic variable is integer (all of them by default)
+    '''
+    def __init__(self, BinvA, Binv, b, varnames, status=None):
+        self.BinvA = BinvA
+        self.Binv = Binv
+        self.b = b
+        self.b_bar = self.Binv @ self.b
+        self.varnames = varnames
+        self.status = status
+        self.integer_rows = np.ones(len(self.b_bar), dtype=bool)
+
+    def complemented(self, nvar):
+        '''
+        This function rewrites the tableau on y_j = 1 - x_j for the nonbasic columns at their upper
+        bound, so that every nonbasic column is at 0: their coefficients change sign and b_bar
+        becomes the value of the basic variables. The slacks (columns from nvar on) are continuous,
+        so the rows where one of them is basic are never fractional.
+
+        Arguments:
+            nvar -- the number of problem variables
+        returns:
+            tableau -- the complemented TableauSnapshot (same status)
+        '''
+        upper = self.status == AT_UPPER
+        basic = np.nonzero(self.status == BASIC)[0]
+        # The basic variable of each row is the one with the unit column
+        head = basic[np.argmax(np.abs(self.BinvA[:, basic]), axis=1)]
+        tableau = TableauSnapshot(np.where(upper, -self.BinvA, self.BinvA), self.Binv, self.b, self.varnames, self.status)
+        tableau.b_bar = self.b_bar - self.BinvA[:, upper].sum(axis=1)
+        tableau.integer_rows = head < nvar
+        return tableau
+
+    def fractional_rows(self, tol=0.0):
+        '''
+        Arguments:
+            tol -- integrality tolerance: values closer than tol to an integer are integer
+        returns:
+            the mask of the rows whose basic variable has a fractional value
+        '''
+        if tol <= 0:
+            return (np.floor(self.b_bar) != self.b_bar) & self.integer_rows
+        return (np.abs(self.b_bar - np.rint(self.b_bar)) > tol) & self.integer_rows
+
+    def fractional_parts(self, rows, tol=0.0):
+        '''
+        This function computes, in one pass, the fractional parts of the given tableau rows
+        and of their right hand sides.
+        
+        Arguments:
+            rows -- indexes (or mask) of the tableau rows
+            tol -- integrality tolerance: the coefficients closer than tol to an integer get a 0 fractional part
+        returns:
+            lhs -- fractional parts of B^-1 A for the rows (shape = k * ncol)
+            rhs -- fractional parts of b_bar for the rows (shape = 1 * k)
+        '''
+        BinvA = self.BinvA[rows]
+        b_bar = self.b_bar[rows]
+        lhs = BinvA - np.floor(BinvA)
+        if tol > 0:
+            lhs[np.abs(BinvA - np.rint(BinvA)) <= tol] = 0.0
+        return lhs, b_bar - np.floor(b_bar)
+
+    def gmi_coefficients(self, rows, nvar, tol=0.0):
+        '''
+        This function computes, in one pass, the Gomory mixed integer cuts sum_j g_j x_j >= 1 of the
+        given rows of a complemented tableau (every nonbasic column at 0). With f0 the fractional part
+        of the row value and f_j the one of its coefficients a_j:
+            g_j = f_j / f0             integer column, f_j <= f0
+            g_j = (1-f_j) / (1-f0)     integer column, f_j > f0
+            g_j = a_j / f0             continuous column (slack), a_j > 0
+            g_j = -a_j / (1-f0)        continuous column (slack), a_j < 0
+
+        Arguments:
+            rows -- indexes of fractional rows with an integer basic variable
+            nvar -- the number of problem variables (the integer columns)
+            tol -- integrality tolerance: the coefficients closer than tol to an integer get a 0 fractional part
+        returns:
+            gmi -- the coefficients of the cuts, 0 on the basic columns (shape = k * ncol)
+        '''
+        f, f0 = self.fractional_parts(rows, tol)
+        f0 = f0[:, np.newaxis]
+        a = self.BinvA[rows]
+        integer = np.arange(a.shape[1]) < nvar
+        gmi = np.where(integer, np.where(f <= f0, f / f0, (1-f) / (1-f0)),
+                       np.where(a > 0, a / f0, -a / (1-f0)))
+        gmi[:, self.status == BASIC] = 0.0
+        return gmi
+
+def format_row(coefs, varnames):
+    '''
+    This function formats a row of coefficients as a rational linear expression.
+    '''
+    output = io.StringIO()
+    for j in np.nonzero(coefs)[0]:
+        if coefs[j] > 0:
+            print('+', end='',file=output)
+        fj = fractions.Fraction(coefs[j]).limit_denominator()
+        num, den = (fj.numerator, fj.denominator)
+        if num == den:
+            print(f'{varnames[j]} ', end='',file=output)
+        elif num != 0:
+            print(f'{num}/{den} {varnames[j]} ', end='',file=output)
+    contents = output.getvalue()
+    output.close()
+    return contents
+
+def format_fraction(value):
+    fv = fractions.Fraction(value).limit_denominator()
+    return f'{fv.numerator}/{fv.denominator}'
+
+def get_tableau(lp, tol=0.0):
+    '''
+    This function get the final tableau of the problem
     
     Arguments:
-        problem -- cplex.Cplex()
+        lp -- the LPBackend of the problem, already solved
+        tol -- the integrality tolerance (only for the log)
      
     returns:
-        n_cuts 
-        b_bar 
-    '''
-    BinvA = np.array(prob.solution.advanced.binvarow())
-
-    nrow = BinvA.shape[0]
-    ncol = BinvA.shape[1]
-    b_bar = np.zeros(nrow)
-    varnames = prob.variables.get_names()
-    b = prob.linear_constraints.get_rhs()
-    Binv = np.array(prob.solution.advanced.binvrow())
-    b_bar = np.matmul(Binv, b)
-    idx = 0     # Compute the nonzeros
-    n_cuts = 0  # Number of fractional variables (cuts to be generated)
-    logging.info('\n\t\t\t\t\t LP relaxation final tableau:\n')
-    for i in range(nrow):
-        output_t = io.StringIO()
-        z = prob.solution.advanced.binvarow(i)
-        for j in range(ncol):
-            if z[j] > 0:
-                print('+', end='',file=output_t)
-            zj = fractions.Fraction(z[j]).limit_denominator()
-            num = zj.numerator
-            den = zj.denominator
-            if num != 0 and num != den:
-                print(f'{num}/{den} {varnames[j]} ', end='',file=output_t)
-            elif num == den:
-                print(f'{varnames[j]} ', end='',file=output_t)
-            if np.floor(z[j]+0.5) != 0:
-                idx += 1
-        b_bar_i = fractions.Fraction(b_bar[i]).limit_denominator()
-        num = b_bar_i.numerator
-        den = b_bar_i.denominator
-        print(f'= {num}/{den}',file=output_t)
-        contents = output_t.getvalue()
-        logging.info("%s",contents)
-        output_t.close()
-        # Count the number of cuts to be generated
-        if np.floor(b_bar[i]) != b_bar[i]:
-            n_cuts += 1    
-    logging.info("Cuts to generate: %d", n_cuts)
-    return n_cuts , b_bar
+        tableau -- TableauSnapshot of the problem
+    '''
+    tableau = lp.tableau()
+    if tracing(TABLEAU):
+        logging.info('\n\t\t\t\t\t LP relaxation final tableau:\n')
+        for i in range(tableau.BinvA.shape[0]):
+            logging.info("%s= %s\n", format_row(tableau.BinvA[i], tableau.varnames), format_fraction(tableau.b_bar[i]))
+    if tracing(ROUND):
+        logging.info("Cuts to generate: %d", np.count_nonzero(tableau.fractional_rows(tol)))
+    return tableau
+
 
+def setResources(prob, workdir=".", threads=0):
+    '''
+    This function sets the resources CPLEX can use for the problem (cplex.Cplex()).
+    
+    Arguments:
+        prob -- cplex.Cplex()
+        workdir -- the directory for the CPLEX working files
+        threads -- the number of threads (0 = CPLEX default)
+    '''
+    if threads > 0:
+        prob.parameters.threads.set(threads)
+    prob.parameters.workdir.set(workdir)
 
 def initializeInstanceVariables(nCols,nRows) : 
         names = []
@@ -130,206 +281,284 @@ def initializeInstanceVariables(nCols,nRows) :
             lower_bounds.append(0.0)
         return names, lower_bounds, upper_bounds,constraint_senses,constraint_names
 
-def determineOptimal(instance, cluster_type):
+def determineOptimal(instance, cluster_type, lp, writer=None, data=None, time_limit=0, cache=False):
     '''
     This function determines the optimal solution of the given instance.
+    With cache=True the result is looked up by the hash of the instance contents, and the MIP
+    is only solved (and its result recorded) on a cache miss. When the MIP stops on the time
+    limit, the best solution found is returned and its best bound is recorded.
     
     Arguments:
         instance
+        cluster_type
+        lp -- the LPBackend of the instance, which solves the MIP
+        writer -- the ArtifactWriter of the instance (optional)
+        data -- the (c, A, b) of the instance, if already loaded (e.g. from the InstanceStore)
+        time_limit -- the time limit of the MIP, MIP_TIME_LIMIT (milliseconds, 0 = none): it is
+                      also the key of the non optimal results in the cache, so it must not vary
+        cache -- use the cache of the MIP results
+    returns:
+        optimal_sol -- the optimal value (or the best one found within the time limit)
     '''
-    c, A, b = getProblemData(instance) 
-    nCols, nRows = (len(c), len(b))
+    c, A, b = data if data is not None else getProblemData(instance)
     # Get the instance name
-    txtname = instance.split("/")[2]
-    name = txtname.split(".txt")[0]
-    cplexlog = name+".log"
-    #Program variables section ####################################################
-    names = []
-    all_constraints = []
-    constraint_names = []
-    constraint_senses = []
-    # Variables 
-    for i in range(nCols):
-        names.append("x"+str(i))
-    # Constraint 
-    for i in range(nRows):
-        constraint_names.append("c"+str(i))
-        constraint_senses.append("L")
-    with cplex.Cplex() as mkp:
-        mkp.set_problem_name(name)
-        mkp.objective.set_sense(mkp.objective.sense.maximize)
-        mkp.set_log_stream(None)
-        mkp.set_error_stream(None)
-        mkp.set_warning_stream(None)
-        mkp.set_results_stream(None)
-        params = mkp.parameters
-        # Disable presolve 
-        params.preprocessing.presolve.set(0) 
-        # Add variables & Slack --------------------------------------------------------------------
-        mkp.variables.add(names=names, types=[mkp.variables.type.binary] * nCols)
-        # Add contraints -------------------------------------------------------------------
-        for i in range(nRows):
-            mkp.linear_constraints.add(lin_expr= [cplex.SparsePair(ind= [j for j in range(nCols)], val= A[i])],
-             rhs= [b[i]], names = [constraint_names[i]], senses = [constraint_senses[i]])
-            all_constraints.append(A[i])
-        # Add objective function -----------------------------------------------------------
-        for i in range(nCols): 
-            mkp.objective.set_linear([(i, c[i])])
-        # Resolve the problem instance
-        mkp.solve()
-        # Report the results 
-        logging.info("\n\t\t\t\t\t\t*** OPTIMAL PLI SOLUTION ***")
-        print_solution(mkp)
-        mkp.write("lp/"+cluster_type+"/"+name+"/optimal.lp")
-        mkp.solution.write("solutions/"+cluster_type+"/"+name+"/optimal.log")
-        optimal_sol= mkp.solution.get_objective_value()
+    name = os.path.basename(instance).split(".txt")[0]
+    if cache:
+        key = instance_key(c, A, b)
+        entry = load_optimal(key, time_limit)
+        if entry is not None:
+            trace(SUMMARY, "MIP reference from the cache: %s (status %s, best bound %s)", entry["value"], entry["status"], entry["best_bound"])
+            return entry["value"]
+    with span("mip", time_limit=time_limit):
+        optimal_sol, status, best_bound = lp.solve_mip(c, A, b, time_limit, writer,
+                                                       "lp/"+cluster_type+"/"+name+"/optimal.lp", "solutions/"+cluster_type+"/"+name+"/optimal.log")
+    # Report the results 
+    trace(ROUND, "\n\t\t\t\t\t\t*** OPTIMAL PLI SOLUTION ***")
+    trace(ROUND, "\t-> Solution status = %s", status)
+    trace(ROUND, "\t-> Solution value  = %f\n", optimal_sol)
+    optimal = status in ("MIP_optimal", "optimal_tolerance")
+    if not optimal:
+        trace(SUMMARY, "MIP not solved to optimality: status %s, value %s, best bound %s", status, optimal_sol, best_bound)
+    if cache:
+        save_optimal(key, optimal_sol, status, best_bound, optimal, time_limit)
     return optimal_sol
 
 
-def initialize_fract_gc(n_cuts,ncol , prob, varnames, b_bar) : 
+# Strategies ranking the fractional rows of the tableau
+SEPARATION_STRATEGIES = ["most_fractional", "weighted", "random"]
+
+def select_rows(tableau, strategy="most_fractional", k=0, tol=0.0, rng=None):
+    '''
+    This function scans every row of the tableau and ranks the ones whose basic variable is fractional:
+    "most_fractional" by the distance of the value from the closest integer, "weighted" by the fractional
+    part of the value divided by the norm of the fractional parts of the row (how far the LP solution is
+    from the cut), "random" in random order.
+    
+    Arguments:
+        tableau -- TableauSnapshot of the problem
+        strategy -- one of SEPARATION_STRATEGIES
+        k -- number of rows returned (0 = all the fractional rows)
+        tol -- the integrality tolerance
+        rng -- numpy.random.Generator of the random strategy
+    returns:
+        rows -- the indexes of the best rows, best first
+    '''
+    rows = np.nonzero(tableau.fractional_rows(tol))[0]
+    f0 = tableau.b_bar[rows] - np.floor(tableau.b_bar[rows])
+    if strategy == "most_fractional":
+        order = np.argsort(-np.minimum(f0, 1-f0), kind="stable")
+    elif strategy == "weighted":
+        lhs, _ = tableau.fractional_parts(rows, tol)
+        norms = np.linalg.norm(lhs, axis=1)
+        order = np.argsort(-f0 / np.where(norms > 0, norms, np.inf), kind="stable")
+    elif strategy == "random":
+        order = (rng if rng is not None else np.random.default_rng()).permutation(len(rows))
+    else:
+        raise ValueError("Unknown separation strategy '"+str(strategy)+"', expected one of: "+", ".join(SEPARATION_STRATEGIES))
+    if k > 0:
+        order = order[:k]
+    return rows[order]
+
+def initialize_fract_gc(tableau, tol=0.0, strategy="most_fractional", k=0, rng=None) : 
     '''
+    This function computes the fractional Gomory cuts of the best tableau rows
+    whose basic variable is fractional (see select_rows), all in one vectorized pass.
     
     Arguments:
-        n_cuts
-        ncol
-        nrow
-        prob
-        varnames
-        b_bar
+        tableau -- TableauSnapshot of the problem
+        tol -- the integrality tolerance
+        strategy, k, rng -- see select_rows
     returns:
-        gc_lhs
-        gc_rhs 
+        gc_lhs -- fractional parts of the rows (shape = k * ncol)
+        gc_rhs -- fractional parts of the right hand sides (shape = 1 * k)
     '''
+    with span("select_rows", strategy=strategy):
+        rows = select_rows(tableau, strategy, k, tol, rng)
+        gc_lhs, gc_rhs = tableau.fractional_parts(rows, tol)
+    if tracing(TABLEAU):
+        logging.info('Generating Gomory cuts...\n')
+        for cut, i in enumerate(rows):
+            logging.info("Row %d gives cut -> %s>= %s", i+1, format_row(gc_lhs[cut], tableau.varnames), format_fraction(gc_rhs[cut]))
+    return gc_lhs, gc_rhs
+
+def initialize_gmi_gc(tableau, nvar, tol=0.0, strategy="most_fractional", k=0, rng=None) : 
+    '''
+    This function computes the Gomory mixed integer cuts of the best rows of a complemented tableau
+    (see TableauSnapshot.complemented and select_rows), all in one vectorized pass, and brings them
+    back to the columns of the tableau: a coefficient g_j on y_j = 1 - x_j gives -g_j x_j and moves
+    g_j to the right hand side.
     
-    cuts = np.zeros([n_cuts,ncol])
-    cut_limits= []
-    gc_sense = [''] * n_cuts
-    gc_rhs   = np.zeros(n_cuts)
-    gc_lhs   = np.zeros([n_cuts, ncol])
-    rmatbeg  = np.zeros(n_cuts)
-    rmatind  = np.zeros(ncol)
-    rmatval  = np.zeros(ncol)
-    logging.info('Generating Gomory cuts...\n')
-    cut = 0  #  Index of cut to be added
-    for i in range(n_cuts):
-        idx = 0
-        output = io.StringIO()
-        if np.floor(b_bar[i]) != b_bar[i]:
-            print(f'Row {i+1} gives cut -> ', end = '', file=output)
-            z = np.copy(prob.solution.advanced.binvarow(i)) # Use np.copy to avoid changing the
-                                                        # optimal tableau in the problem instance
-            rmatbeg[cut] = idx
-            for j in range(ncol):
-                z[j] = z[j] - np.floor(z[j])
-             
-                if z[j] != 0:
-                    rmatind[idx] = j
-                    rmatval[idx] = z[j]
-                    idx +=1
-                # Print the cut
-                if z[j] > 0:
-                    print('+', end = '',file=output)
-                if (z[j] != 0):
-                        fj = fractions.Fraction(z[j])
-                        fj = fj.limit_denominator()
-                        num, den = (fj.numerator, fj.denominator)
-                        print(f'{num}/{den} {varnames[j]} ', end='',file=output)
-           
-            gc_lhs[i,:] = z
-            cuts[i,:]= z
-            gc_rhs[cut] = b_bar[i] - np.copy(np.floor(b_bar[i])) # np.copy as above
-            gc_sense[cut] = 'L'
-            gc_rhs_i = fractions.Fraction(gc_rhs[cut]).limit_denominator()
-            num = gc_rhs_i.numerator
-            den = gc_rhs_i.denominator
-            print(f'>= {num}/{den}',file=output)
-            cut_limits.append(gc_rhs[cut])
-            cut += 1
-            contents = output.getvalue()
-            output.close()
-            logging.info(contents)
+    Arguments:
+        tableau -- the complemented TableauSnapshot of the problem
+        nvar -- the number of problem variables
+        tol -- the integrality tolerance
+        strategy, k, rng -- see select_rows
+    returns:
+        gc_lhs -- the coefficients of the cuts ">=" (shape = k * ncol)
+        gc_rhs -- the right hand sides of the cuts (shape = 1 * k)
+    '''
+    with span("select_rows", strategy=strategy):
+        rows = select_rows(tableau, strategy, k, tol, rng)
+        gmi = tableau.gmi_coefficients(rows, nvar, tol)
+    upper = tableau.status == AT_UPPER
+    gc_lhs = np.where(upper, -gmi, gmi)
+    gc_rhs = 1 - gmi[:, upper].sum(axis=1)
+    if tracing(TABLEAU):
+        logging.info('Generating Gomory mixed integer cuts...\n')
+        for cut, i in enumerate(rows):
+            logging.info("Row %d gives cut -> %s>= %s", i+1, format_row(gc_lhs[cut], tableau.varnames), format_fraction(gc_rhs[cut]))
     return gc_lhs, gc_rhs
 
-def generate_gc(mkp, A, gc_lhs, gc_rhs, names) : 
+def generate_gc(A, b, gc_lhs, gc_rhs, names) : 
     '''
+    This function expresses the Gomory cuts in terms of the problem variables only
+    and turns them into "<=" constraints.
     
     Arguments:
-        mkp
-        A
-        gc_lhs
-        gc_rhs
-        names
+        A -- the constraints matrix of the model rows, without slack columns (shape = m * n)
+        b -- the right hand side of the model rows (shape = 1 * m)
+        gc_lhs -- the cuts on the tableau columns, slacks included (shape = k * (n+m))
+        gc_rhs -- the right hand sides of the cuts (shape = 1 * k)
+        names -- the names of the columns
     returns:
-        cuts
-        cuts_limits
+        cuts -- the cut coefficients (shape = k * n)
+        cuts_limits -- the cut right hand sides (shape = 1 * k)
         cut_senses
     '''
-    logging.info('*** GOMORY CUTS ***\n')
-    cuts = []
-    cuts_limits = []
-    cut_senses = []
-    for i, gc in enumerate(gc_lhs):
-        output = io.StringIO()
-        cuts.append([])
-        lhs, rhs = get_lhs_rhs(mkp, gc_lhs[i], gc_rhs[i], A)
-        # Print the cut
-        for j in range(len(lhs)):
-            if -lhs[j] > 0:
-                print('+', end = '',file=output)
-            if (-lhs[j] != 0):
-                print(f'{-lhs[j]} {names[j]} ', end='',file=output)
-                cuts[i].append(-lhs[j])
-            if (-lhs[j] == 0):
-                print(f'{-lhs[j]} {names[j]} ', end='',file=output)
-                cuts[i].append(0)
-        print(f'<= {-rhs[0]}\n', end='',file=output)
-        cuts_limits.append(-rhs[0])
-        cut_senses.append('L')
-        contents = output.getvalue()
-        output.close()
-        logging.info(contents)
+    with span("generate"):
+        lhs, rhs = get_lhs_rhs(gc_lhs, gc_rhs, A, b)
+    cuts = -lhs
+    cuts_limits = -rhs
+    cut_senses = ['L'] * len(cuts_limits)
+    if tracing(TABLEAU):
+        logging.info('*** GOMORY CUTS ***\n')
+        for i in range(len(cuts_limits)):
+            logging.info("%s<= %s\n", " ".join(f'{cuts[i,j]:+} {names[j]}' for j in range(cuts.shape[1])), cuts_limits[i])
     return cuts, cuts_limits, cut_senses
 
-def get_lhs_rhs(prob, cut_row, cut_rhs, A):
-
-    ncol = len(A[0])
-    cut_row = np.append(cut_row, cut_rhs)
-    b = np.array(prob.linear_constraints.get_rhs())
-    A = np.append(A, b.reshape(-1, 1), axis=1)
-    plotted_vars = np.nonzero(prob.objective.get_linear())[0]
-    # Assumption: plotted variables are at the beginning of the initial tableau
-    for i, sk in enumerate(range(len(plotted_vars), ncol)):
-        cut_coef = cut_row[sk]
-        cut_row -= A[i,:] * cut_coef
-    lhs = cut_row[:len(plotted_vars)]
-    rhs = cut_row[ncol:]
+def get_lhs_rhs(cut_rows, cut_rhs, A, b):
+    '''
+    This function eliminates the slack variables from a block of cuts.
+    Row i of the initial tableau is A[i] x + s_i = b[i], so subtracting it, multiplied by the
+    coefficient of s_i, from every cut removes s_i: this is done for all the cuts and all the
+    slacks with a single matrix product.
+    
+    Arguments:
+        cut_rows -- the cuts on the tableau columns, the slack of row i at column n+i (shape = k * (n+m))
+        cut_rhs -- the right hand sides of the cuts (shape = 1 * k)
+        A -- the constraints matrix without slack columns (shape = m * n)
+        b -- the right hand side (shape = 1 * m)
+    returns:
+        lhs -- the cuts on the problem variables (shape = k * n)
+        rhs -- the right hand sides (shape = 1 * k)
+    '''
+    ncol = A.shape[1]
+    slack_coefs = cut_rows[:, ncol:]
+    lhs = cut_rows[:, :ncol] - slack_coefs @ A
+    rhs = cut_rhs - slack_coefs @ b
     return lhs, rhs
+
+# Coefficients smaller than this (relative to the largest one) are removed from a cut
+ZERO_TOL = 1e-12
+# Tolerance of the rational reconstruction of a cut
+RATIONAL_TOL = 1e-9
+
+def filter_cuts(cuts, limits, x, min_violation=0.0, max_dynamism=0.0, max_denominator=0):
+    '''
+    This function cleans the cuts (coefs x <= limit, 0 <= x <= 1) before they reach the LP:
+    the negligible coefficients are removed (relaxing the right hand side when needed, so that the cut
+    stays valid), the cuts with a bad dynamic range or that the LP solution violates by too little
+    are rejected, and the others are made integer (when the coefficients are rationals with a small
+    common denominator) or rescaled to a largest coefficient of 1.
     
-def print_solution(prob : cplex.Cplex()):
+    Arguments:
+        cuts, limits -- the cuts (shape = k * n, 1 * k)
+        x -- the LP solution (problem variables only)
+        min_violation -- minimum violation of a cut normalized by its largest coefficient
+        max_dynamism -- maximum ratio between the largest and the smallest coefficient of a cut (0 = no limit)
+        max_denominator -- largest common denominator tried to make a cut integer (0 = never)
+    returns:
+        cuts, limits -- the accepted cuts
+        rejected -- dictionary reason (dynamism, violation) -> number of rejected cuts
+        rationalized -- number of cuts made integer
+    '''
+    cuts = np.array(cuts, dtype=np.float64).reshape(len(limits), len(x))
+    limits = np.array(limits, dtype=np.float64)
+    rejected = {"dynamism": 0, "violation": 0}
+    if len(limits) == 0:
+        return cuts, limits, rejected, 0
+    scale = np.abs(cuts).max(axis=1)
+    # Remove the negligible coefficients: a negative one is moved to the right hand side at x = 1
+    tiny = (np.abs(cuts) <= ZERO_TOL * scale[:, None]) & (cuts != 0)
+    limits = limits - np.where(tiny & (cuts < 0), cuts, 0).sum(axis=1)
+    cuts[tiny] = 0.0
+    keep = scale > 0
+    if max_dynamism > 0:
+        smallest = np.where(cuts != 0, np.abs(cuts), np.inf).min(axis=1)
+        bad_range = keep & (scale > max_dynamism * smallest)
+        rejected["dynamism"] = int(np.count_nonzero(bad_range))
+        keep &= ~bad_range
+    violation = (cuts @ x - limits) / np.where(scale > 0, scale, 1)
+    weak = keep & (violation <= min_violation)
+    rejected["violation"] = int(np.count_nonzero(weak))
+    keep &= ~weak
+    cuts, limits, scale = cuts[keep], limits[keep], scale[keep]
+    rationalized = 0
+    for i in range(len(limits)):
+        integer_row = rationalize(np.append(cuts[i], limits[i]), max_denominator)
+        if integer_row is not None:
+            cuts[i], limits[i] = integer_row[:-1], integer_row[-1]
+            rationalized += 1
+        else:
+            cuts[i] /= scale[i]
+            limits[i] /= scale[i]
+    if tracing(ROUND):
+        logging.info("Cuts rejected -> dynamism: %d, violation: %d; made integer: %d", rejected["dynamism"], rejected["violation"], rationalized)
+    return cuts, limits, rejected, rationalized
+
+def rationalize(row, max_denominator):
     '''
-    This function print solution of problem (cplex.Cplex())
+    This function looks for the smallest common denominator d <= max_denominator of the values of row.
+    
+    returns:
+        the integer row d * row divided by its greatest common divisor (None if there is no such d)
+    '''
+    if max_denominator <= 0:
+        return None
+    denominators = np.arange(1, max_denominator+1)
+    scaled = np.multiply.outer(denominators, row)
+    error = np.abs(scaled - np.rint(scaled)).max(axis=1)
+    found = np.nonzero(error <= RATIONAL_TOL * np.maximum(1, np.abs(scaled).max(axis=1)))[0]
+    if len(found) == 0:
+        return None
+    integer_row = np.rint(scaled[found[0]])
+    divisor = np.gcd.reduce(np.abs(integer_row).astype(np.int64))
+    return integer_row / max(divisor, 1)
+    
+def print_solution(lp):
+    '''
+    This function print solution of problem
     
     Arguments:
-        problem -- cplex.Cplex()
+        lp -- the LPBackend of the problem, already solved
     
     '''
-    ncol = len(prob.variables.get_cols())
-    nrow = len(prob.linear_constraints.get_rows())
-    varnames = prob.variables.get_names()
-    slack = np.round(prob.solution.get_linear_slacks(), 3)
-    x = np.round(prob.solution.get_values(), 3)
+    sol=  lp.objective_value()
+    sol_type= sol.is_integer()
+    status = lp.status()
 
     # Log everything about the solutions found
-    logging.info("\t-> Solution status = %s", prob.solution.status[prob.solution.get_status()])
-    logging.info("\t-> Solution value  = %f\n", prob.solution.get_objective_value())
-    logging.info("SLACKS SITUATION:")
-    for i in range(nrow):
-        logging.info(f'-> Row {i}:  Slack = {slack[i]}')
-    logging.info("\n\t\t\t\t\t PROBLEM VARIABLES:")
-    for j in range(ncol):
-        logging.info(f'-> Column {j} (variable {varnames[j]}):  Value = {x[j]}')
-    
-    sol=  prob.solution.get_objective_value()
-    sol_type= sol.is_integer()
-    status = prob.solution.status[prob.solution.get_status()]
-    return sol, sol_type, status
\ No newline at end of file
+    if tracing(ROUND):
+        logging.info("\t-> Solution status = %s", status)
+        logging.info("\t-> Solution value  = %f\n", sol)
+    if tracing(TABLEAU):
+        varnames = lp.names()
+        x = np.round(lp.values(), 3)
+        nCols = lp.A.shape[1]
+        logging.info("SLACKS SITUATION:")
+        for i in range(len(x)-nCols):
+            logging.info(f'-> Row {i}:  Slack = {x[nCols+i]}')
+        logging.info("\n\t\t\t\t\t PROBLEM VARIABLES:")
+        for j in range(len(x)):
+            logging.info(f'-> Column {j} (variable {varnames[j]}):  Value = {x[j]}')
+    return sol, sol_type, status
@@ -0,0 +1,75 @@
+from array import array
+import pandas as pd
+import math
+import csv
+import os
+
+# Columns of the statistics and their types
+SCHEMA = [("name", str), ("cluster_type", str), ("nvar", int), ("nconstraints", int),
+          ("optimal_sol", float), ("sol", float), ("sol_is_integer", bool), ("status", str),
+          ("ncuts", int), ("elapsed_time", float), ("gap", float), ("relative_gap", float),
+          ("iterations", int), ("build_time", float), ("solve_time", float), ("stop_reason", str)]
+
+# Compact storage of each type and value used when a row does not have it
+STORAGE = {int: lambda: array('q'), float: lambda: array('d'), bool: lambda: array('b'), str: list}
+MISSING = {int: -1, float: math.nan, bool: False, str: ""}
+
+class StatsCollector:
+    '''
+    This class collects the statistics rows (as built by getStatistics) in typed columns,
+    appending each row in O(1), and flushes the new rows to an append-only CSV file during the run,
+    so that an interrupted run keeps everything flushed so far.
+
+    Attributes:
+        path -- the CSV file (truncated when the collector is created)
+        schema -- list of (column, type)
+    '''
+    def __init__(self, path="stats.csv", schema=SCHEMA):
+        self.path = path
+        self.schema = schema
+        self._columns = [STORAGE[kind]() for _, kind in schema]
+        self._flushed = 0
+        with open(self.path, "w", newline="") as file:
+            csv.writer(file).writerow([column for column, _ in schema])
+
+    def __len__(self):
+        return len(self._columns[0])
+
+    def append(self, row):
+        '''
+        This function appends a row: a list in schema order or a dict column -> value
+        (the missing columns get a default value).
+        '''
+        if isinstance(row, dict):
+            row = [row.get(column, MISSING[kind]) for column, kind in self.schema]
+        for values, value, (_, kind) in zip(self._columns, row, self.schema):
+            values.append(kind(value))
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def flush(self):
+        '''
+        This function appends to the CSV file the rows collected since the last flush.
+        '''
+        if self._flushed == len(self):
+            return
+        with open(self.path, "a", newline="") as file:
+            writer = csv.writer(file)
+            for i in range(self._flushed, len(self)):
+                writer.writerow([values[i] if kind is not bool else bool(values[i]) for values, (_, kind) in zip(self._columns, self.schema)])
+        self._flushed = len(self)
+
+    def to_dataframe(self):
+        data = {}
+        for values, (column, kind) in zip(self._columns, self.schema):
+            data[column] = pd.Series(values, dtype=kind if kind is not str else object)
+        return pd.DataFrame(data)
+
+def exportXlsx(csv_path="stats.csv", xlsx_path="stats.xlsx"):
+    '''
+    This function converts the CSV statistics of a run to an Excel file (post-processing step).
+    '''
+    if os.path.exists(csv_path):
+        pd.read_csv(csv_path).to_excel(xlsx_path)
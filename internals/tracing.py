@@ -0,0 +1,81 @@
+import logging
+import json
+import os
+
+# Trace levels, each one includes the previous ones
+OFF = 0         # nothing is traced
+SUMMARY = 1     # one line/record for each instance
+ROUND = 2       # one line/record for each Gomory round and each LP solve
+TABLEAU = 3     # full tableaus, cuts, slacks and variables values
+
+LEVELS = {"off": OFF, "summary": SUMMARY, "round": ROUND, "tableau": TABLEAU}
+
+_level = SUMMARY
+_records = None
+
+def set_trace_level(level):
+    '''
+    This function sets the trace level of the whole run.
+
+    Arguments:
+        level -- one of the LEVELS names (or its value)
+    '''
+    global _level
+    if isinstance(level, str):
+        if level.strip().lower() not in LEVELS:
+            raise ValueError("Unknown trace level '"+level+"', expected one of: "+", ".join(LEVELS))
+        level = LEVELS[level.strip().lower()]
+    _level = int(level)
+
+def get_trace_level():
+    return _level
+
+def tracing(level):
+    '''
+    This function tells whether the given level is traced. Callers must check it before
+    building any message, so that disabled levels cost no formatting and no CPLEX queries.
+    '''
+    return _level >= level
+
+def trace(level, msg, *args):
+    '''
+    This function logs the message (lazily formatted by logging) if the level is traced.
+    '''
+    if _level >= level:
+        logging.info(msg, *args)
+
+def open_records(path):
+    '''
+    This function opens (truncating it) the file of the structured records of the run:
+    one compact JSON object per line.
+    '''
+    global _records
+    close_records()
+    _records = open(path, "w")
+
+def close_records():
+    global _records
+    if _records is not None:
+        _records.close()
+        _records = None
+
+def record(level, kind, **fields):
+    '''
+    This function writes a structured record (e.g. kind="round" with round, ncuts, bound,
+    gap and timings) if the level is traced and a records file is open.
+    '''
+    if _level >= level and _records is not None:
+        fields["type"] = kind
+        _records.write(json.dumps(fields, separators=(",", ":"))+"\n")
+        _records.flush()
+
+def merge_records(path):
+    '''
+    This function appends the records of another file (e.g. written by a worker process)
+    to the records file of the run.
+    '''
+    if _records is not None and os.path.exists(path):
+        with open(path) as file:
+            for line in file:
+                _records.write(line)
+        _records.flush()
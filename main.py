@@ -1,12 +1,16 @@
 from internals.solver import solveInstance
+from internals.parallel import solveInParallel
+from internals.instance_store import store
+from internals.lp_backend import BACKENDS
+from internals.stats_collector import StatsCollector, exportXlsx
 from internals.general_utils import *
-import pandas as pd
+from internals.tracing import set_trace_level, open_records, close_records
+from internals.profiling import span, enable_profiling, export_chrome_trace, summary_table
 import warnings
 import logging
 import sys
 import os
 
-columns=["name", "cluster_type", "nvar","nconstraints","optimal_sol","sol","sol_is_integer","status","ncuts","elapsed_time","gap","relative_gap","iterations"]
 logging.basicConfig(filename='resolution.log', format='%(asctime)s - %(message)s',level=logging.INFO, datefmt='%d-%b-%y %H:%M:%S')
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 warnings.filterwarnings('ignore')
@@ -14,42 +18,80 @@ warnings.filterwarnings('ignore')
 if __name__ == '__main__':
     # Flush Log
     flushLog("resolution.log")
-    # Statistics variables in DataFrame
-    stats = pd.DataFrame(columns=columns)
+    # Statistics rows, flushed to stats.csv after every instance
+    stats = StatsCollector("stats.csv")
     # Read the configuration file
-    config = ConfigParser()
-    config.read('config.ini')
+    config = store.get_config()
+    # Command line options
+    options, argv = parseOptions(sys.argv, ["-trace", "-j", "-xlsx", "-backend", "-profile"])
+    try:
+        set_trace_level(options.get("-trace", config['DEFAULT'].get('TRACE_LEVEL', 'summary')))
+        n_jobs = int(options.get("-j", 1))
+    except ValueError:
+        invalidInput()
+    if "-backend" in options:
+        if options["-backend"] not in BACKENDS:
+            invalidInput()
+        store.override('LP_BACKEND', options["-backend"])
+    threads = config['DEFAULT'].getint('CPLEX_THREADS', 0)
+    open_records("rounds.jsonl")
+    # Spans of every phase, exported at the end of the run (off by default: the spans then cost nothing)
+    enable_profiling("-profile" in options)
 
-    if len(sys.argv) == 2:
-        if not sys.argv[1]=="-all":
+    # Instances to solve: (instance, cluster, timeout)
+    jobs = []
+    if len(argv) == 2:
+        if not argv[1]=="-all":
             invalidInput()
         else:
             print("Generating istances ....")
             for cluster in config.sections():
-                generateIstances(cluster)
-                print("Solving cluster '",cluster,"'...")
-                for instance in os.listdir("instances/"+cluster+"/") :
-                    stats=solveInstance(instance,cluster,stats)
-                print("...Done.")
+                with span("generate", cluster=cluster):
+                    generateIstances(cluster)
+                cluster_jobs = [(instance, cluster, config[cluster].getint('INSTANCE_TIMEOUT', 0)) for instance in sorted(os.listdir("instances/"+cluster+"/"))]
+                if n_jobs > 1:
+                    jobs += cluster_jobs
+                else:
+                    print("Solving cluster '",cluster,"'...")
+                    for instance, cluster, timeout in cluster_jobs :
+                        stats=solveInstance(instance,cluster,stats,threads)
+                    print("...Done.")
 
-    elif len(sys.argv) == 3:
-        execution_type = sys.argv[1]
+    elif len(argv) == 3:
+        execution_type = argv[1]
         if execution_type == "-c":
-            cluster=sys.argv[2]
+            cluster=argv[2]
             print("Generating istances ....")
-            generateIstances(cluster)
+            with span("generate", cluster=cluster):
+                generateIstances(cluster)
             print("...Done.")
             
-            print("Solving cluster '",cluster,"'...")
-            for instance in os.listdir("instances/"+cluster+"/") :
-                stats=solveInstance(instance,cluster,stats)
-            print("...Done.")
+            cluster_jobs = [(instance, cluster, config[cluster].getint('INSTANCE_TIMEOUT', 0)) for instance in sorted(os.listdir("instances/"+cluster+"/"))]
+            if n_jobs > 1:
+                jobs += cluster_jobs
+            else:
+                print("Solving cluster '",cluster,"'...")
+                for instance, cluster, timeout in cluster_jobs :
+                    stats=solveInstance(instance,cluster,stats,threads)
+                print("...Done.")
             
         elif execution_type == "-s":
-            stats=solveInstance(sys.argv[2].split("/")[2],sys.argv[2].split("/")[1],stats)
+            stats=solveInstance(argv[2].split("/")[2],argv[2].split("/")[1],stats,threads)
             print("...Done.")
         else:
             invalidInput()
     else:
         invalidInput()
-    stats.to_excel("stats.xlsx")
\ No newline at end of file
+
+    if len(jobs) > 0:
+        print("Solving", len(jobs), "instances with", n_jobs, "workers...")
+        stats = solveInParallel(jobs, n_jobs, stats, threads)
+        print("...Done.")
+    close_records()
+    if "-profile" in options:
+        export_chrome_trace(options["-profile"])
+        print(summary_table())
+        print("Trace of the spans written to", options["-profile"])
+    # Optional export of the statistics to Excel
+    if "-xlsx" in options:
+        exportXlsx("stats.csv", options["-xlsx"])
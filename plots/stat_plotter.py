@@ -2,6 +2,7 @@ from matplotlib import colors
 import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
+import os
 
 params = {
     'axes.titlesize': 16,
@@ -13,7 +14,10 @@ params = {
 plt.rcParams.update(params)
 
 def get_raw_data():
-    df = pd.read_excel('stats.xlsx')
+    if os.path.exists('stats.csv'):
+        df = pd.read_csv('stats.csv')
+    else:
+        df = pd.read_excel('stats.xlsx')
     return df
 
 
@@ -0,0 +1,38 @@
+from internals.artifacts import ArtifactWriter, StagedFile
+import gzip
+import os
+
+def staged(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return StagedFile(str(path))
+
+def test_staged_files_are_moved(tmp_path):
+    writer = ArtifactWriter("final")
+    model, solution = staged(tmp_path, "model.lp", "max x0\n"), staged(tmp_path, "model.sol", "<CPLEXSolution/>\n")
+    writer.write_model("final", lambda: (model, solution), str(tmp_path / "lp" / "final.lp"), str(tmp_path / "log" / "final.log"))
+    writer.write_model("final", lambda: ("max x1\n", "status = optimal\n"), str(tmp_path / "lp" / "text.lp"), str(tmp_path / "log" / "text.log"))
+    writer.close()
+    assert (tmp_path / "lp" / "final.lp").read_text() == "max x0\n"
+    assert (tmp_path / "log" / "final.log").read_text() == "<CPLEXSolution/>\n"
+    assert (tmp_path / "lp" / "text.lp").read_text() == "max x1\n"
+    assert not os.path.exists(model.path) and not os.path.exists(solution.path)
+    assert writer.written == len("max x0\n<CPLEXSolution/>\nmax x1\nstatus = optimal\n") and writer.dropped == 0
+
+def test_staged_files_are_compressed(tmp_path):
+    writer = ArtifactWriter("final", compress=True)
+    model, solution = staged(tmp_path, "model.lp", "max x0\n"), staged(tmp_path, "model.sol", "<CPLEXSolution/>\n")
+    writer.write_model("final", lambda: (model, solution), str(tmp_path / "final.lp"), str(tmp_path / "final.log"))
+    writer.close()
+    assert gzip.decompress((tmp_path / "final.lp.gz").read_bytes()) == b"max x0\n"
+    assert gzip.decompress((tmp_path / "final.log.gz").read_bytes()) == b"<CPLEXSolution/>\n"
+    assert not os.path.exists(model.path) and not os.path.exists(solution.path)
+
+def test_staged_files_over_the_budget_are_removed(tmp_path):
+    writer = ArtifactWriter("final", budget=10)
+    model, solution = staged(tmp_path, "model.lp", "max x0\n"), staged(tmp_path, "model.sol", "<CPLEXSolution/>\n")
+    writer.write_model("final", lambda: (model, solution), str(tmp_path / "final.lp"), str(tmp_path / "final.log"))
+    writer.close()
+    assert (tmp_path / "final.lp").exists() and not (tmp_path / "final.log").exists()
+    assert not os.path.exists(solution.path)
+    assert writer.written == len("max x0\n") and writer.dropped == 1
@@ -0,0 +1,45 @@
+from internals.lp_backend import make_backend
+from internals.solver_utils import getProblemData
+from scipy.optimize import linprog
+import numpy as np
+import pytest
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INSTANCE = os.path.join(ROOT, "instances", "cluster_medium_A", "inst_0.txt")
+
+@pytest.fixture(params=["numpy", "cplex"])
+def lp(request, tmp_path):
+    if request.param == "cplex":
+        pytest.importorskip("cplex")
+    lp = make_backend(request.param, "test", None, str(tmp_path))
+    yield lp
+    lp.close()
+
+def test_remove_rows_then_add_rows(lp):
+    c, A, b = getProblemData(INSTANCE)
+    n = len(c)
+    lp.build(c, A, b)
+    assert lp.solve() == "optimal"
+    # Three rows that never bind: their slacks are basic, so any of them can be removed
+    loose = np.ones((3, n))
+    lp.add_rows(loose, np.full(3, n+1.0), ["cut_1", "cut_2", "cut_3"])
+    assert lp.solve() == "optimal"
+    lp.remove_rows([len(b)+1])
+    binding = np.where(lp.values()[:n] > 0.5, 1.0, 0.0)
+    rows = np.vstack((binding, np.ones(n)))
+    rhs = np.array([max(binding.sum() - 1, 0.0), n+2.0])
+    lp.add_rows(rows, rhs, ["cut_4", "cut_5"])
+    assert lp.solve() == "optimal"
+
+    # Every column keeps a name of its own, the slacks included
+    names = lp.names()
+    assert len(names) == lp.num_cols() == n + len(b) + 4
+    assert len(set(names)) == len(names)
+    A_all = np.vstack((A, loose[[0, 2]], rows))
+    b_all = np.concatenate((b, [n+1.0, n+1.0], rhs))
+    assert np.allclose(lp.A, A_all) and np.allclose(lp.b, b_all)
+    expected = linprog(-c, A_ub=A_all, b_ub=b_all, bounds=(0, 1), method="highs")
+    assert lp.objective_value() == pytest.approx(-expected.fun, rel=1e-7, abs=1e-7)
+    values = lp.values()
+    assert np.allclose(A_all @ values[:n] + values[n:], b_all, atol=1e-7)
@@ -0,0 +1,56 @@
+from internals.numpy_backend import NumpyBackend
+from internals.solver_utils import getProblemData
+from scipy.optimize import linprog
+import numpy as np
+import pytest
+import glob
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INSTANCES = sorted(glob.glob(os.path.join(ROOT, "instances", "*", "*.txt")))
+
+def linprog_value(c, A, b):
+    '''
+    This function solves max c x, A x <= b, 0 <= x <= 1 with scipy.optimize.linprog (HiGHS).
+    '''
+    result = linprog(-c, A_ub=A, b_ub=b, bounds=(0, 1), method="highs")
+    assert result.status == 0
+    return -result.fun
+
+def check_solution(lp, c):
+    '''
+    This function checks that the solution of the backend is primal feasible and gives its objective value.
+    '''
+    values = lp.values()
+    nCols = lp.A.shape[1]
+    x, s = values[:nCols], values[nCols:]
+    assert np.allclose(lp.A @ x + s, lp.b, atol=1e-7)
+    assert np.all(x >= -1e-9) and np.all(x <= 1+1e-9) and np.all(s >= -1e-9)
+    assert lp.objective_value() == pytest.approx(c @ x)
+
+@pytest.mark.parametrize("path", INSTANCES, ids=lambda path: os.path.relpath(path, os.path.join(ROOT, "instances")))
+def test_solve_add_and_remove_rows_match_linprog(path):
+    c, A, b = getProblemData(path)
+    lp = NumpyBackend("test")
+    lp.build(c, A, b)
+    assert lp.solve() == "optimal"
+    check_solution(lp, c)
+    assert lp.objective_value() == pytest.approx(linprog_value(c, A, b), rel=1e-7, abs=1e-7)
+
+    # A row binding at the optimum (it cuts off the current solution) and a row that never binds
+    x = lp.values()[:len(c)]
+    binding = np.where(x > 0.5, 1.0, 0.0)
+    rows = np.vstack((binding, np.ones(len(c))))
+    rhs = np.array([max(binding.sum() - 1, 0.0), len(c) + 1.0])
+    lp.add_rows(rows, rhs)
+    assert lp.solve() == "optimal"
+    check_solution(lp, c)
+    A_cuts, b_cuts = np.vstack((A, rows)), np.concatenate((b, rhs))
+    assert lp.objective_value() == pytest.approx(linprog_value(c, A_cuts, b_cuts), rel=1e-7, abs=1e-7)
+
+    # The loose row has a basic slack: removing it keeps the optimum
+    lp.remove_rows([len(b)+1])
+    assert lp.solve() == "optimal"
+    check_solution(lp, c)
+    assert lp.objective_value() == pytest.approx(linprog_value(c, A_cuts[:-1], b_cuts[:-1]), rel=1e-7, abs=1e-7)
+    lp.close()
@@ -0,0 +1,40 @@
+from internals.optimal_cache import instance_key, load_optimal, save_optimal
+from internals.solver_utils import getProblemData
+import pytest
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INSTANCE = os.path.join(ROOT, "instances", "cluster_large", "inst_0.txt")
+
+@pytest.fixture
+def key(tmp_path, monkeypatch):
+    # The cache lives in cache/optimal under the working directory
+    monkeypatch.chdir(tmp_path)
+    return instance_key(*getProblemData(INSTANCE))
+
+def test_time_limited_entry_is_reused(key):
+    save_optimal(key, 10.0, "MIP_time_limit_feasible", 12.5, False, 300000)
+    # The next run asks for the same configured limit, or a shorter one
+    for time_limit in (300000, 300000.0, 120000):
+        entry = load_optimal(key, time_limit)
+        assert entry is not None
+        assert entry["value"] == 10.0 and entry["best_bound"] == 12.5 and entry["time_limit"] == 300000
+
+def test_time_limited_entry_is_not_reused_with_more_time(key):
+    save_optimal(key, 10.0, "MIP_time_limit_feasible", 12.5, False, 300000)
+    assert load_optimal(key, 600000) is None
+    # Without a time limit the MIP would be solved to optimality
+    assert load_optimal(key, 0) is None
+
+def test_optimal_entry_is_always_reused(key):
+    save_optimal(key, 11.0, "MIP_optimal", 11.0, True, 1000)
+    assert load_optimal(key, 0)["value"] == 11.0
+    assert load_optimal(key, 600000)["value"] == 11.0
+
+def test_key_depends_on_the_contents(key):
+    c, A, b = getProblemData(INSTANCE)
+    assert instance_key(c, A, b) == key
+    b = b.copy()
+    b[0] += 1
+    assert instance_key(c, A, b) != key
+    assert load_optimal(instance_key(c, A, b), 300000) is None
@@ -0,0 +1,199 @@
+from internals.numpy_backend import NumpyBackend
+from internals.separators import zero_half_cuts, cover_cuts, mir_cuts, GomorySeparator, MIRSeparator
+from internals.solver_utils import getProblemData, AT_UPPER, BASIC
+import numpy as np
+import itertools
+import pytest
+import glob
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Instances small enough to enumerate their 0/1 points
+SMALL_INSTANCES = sorted(glob.glob(os.path.join(ROOT, "instances", "cluster_small", "*.txt")))
+RANDOM_SEEDS = range(40)
+
+def random_instance(seed):
+    '''
+    This function generates a small knapsack system like the ones of the instance generator.
+    '''
+    rng = np.random.default_rng(seed)
+    n, m = int(rng.integers(4, 13)), int(rng.integers(1, 5))
+    A = rng.integers(1, 21, (m, n)).astype(np.float64)
+    b = np.floor(A.sum(axis=1) * rng.uniform(0.2, 0.7, m))
+    c = rng.integers(1, 21, n).astype(np.float64)
+    return c, A, b
+
+def small_instances():
+    return [pytest.param(getProblemData(path), id=os.path.basename(path)) for path in SMALL_INSTANCES] + \
+           [pytest.param(random_instance(seed), id="random_"+str(seed)) for seed in RANDOM_SEEDS]
+
+def feasible_points(A, b):
+    '''
+    returns:
+        points -- every 0/1 point with A x <= b (shape = k * n)
+    '''
+    points = np.array(list(itertools.product([0.0, 1.0], repeat=A.shape[1])))
+    return points[(points @ A.T <= b + 1e-9).all(axis=1)]
+
+def separation_rounds(separate, c, A, b, rounds=3):
+    '''
+    This function runs a few rounds of a separator on the LP relaxation, the cuts of a round being
+    added before the next one (so that the later rounds also combine cuts).
+
+    returns:
+        rounds -- list of (x, cuts, limits) of the rounds that found cuts
+    '''
+    lp = NumpyBackend("test")
+    lp.build(c, A, b)
+    found = []
+    for _ in range(rounds):
+        assert lp.solve() == "optimal"
+        x = lp.values()[:len(c)]
+        cuts, limits = separate(lp, x)
+        if len(limits) == 0:
+            break
+        found.append((x, cuts, limits))
+        lp.add_rows(cuts, limits)
+    lp.close()
+    return found
+
+def check_cuts(A, b, found):
+    '''
+    This function checks that every cut is violated by the LP point it was separated from and
+    that no 0/1 point feasible for the original rows violates it.
+    '''
+    points = feasible_points(A, b)
+    for x, cuts, limits in found:
+        assert np.all(cuts @ x > limits + 1e-9)
+        assert np.all(points @ cuts.T <= limits + 1e-7)
+
+@pytest.mark.parametrize("instance", small_instances())
+def test_zero_half_cuts_are_valid(instance):
+    c, A, b = instance
+    check_cuts(A, b, separation_rounds(lambda lp, x: zero_half_cuts(lp.A, lp.b, x), c, A, b))
+
+def test_zero_half_cuts_are_found():
+    found = [separation_rounds(lambda lp, x: zero_half_cuts(lp.A, lp.b, x), *random_instance(seed)) for seed in RANDOM_SEEDS]
+    assert sum(len(rounds) > 0 for rounds in found) > len(RANDOM_SEEDS) // 2
+
+def test_zero_half_pair_of_rows():
+    # At x = 1/2 neither row gives a violated cut alone, but half of their sum, rounded down, is
+    # x0 + x1 + x2 <= 1
+    A = np.array([[1.0, 1.0, 0.0], [1.0, 1.0, 2.0]])
+    b = np.array([1.0, 2.0])
+    x = np.full(3, 0.5)
+    for row in range(2):
+        assert len(zero_half_cuts(A[row:row+1], b[row:row+1], x)[1]) == 0
+    cuts, limits = zero_half_cuts(A, b, x)
+    assert len(limits) == 1
+    assert np.allclose(cuts[0], [1.0, 1.0, 1.0]) and limits[0] == 1.0
+
+@pytest.mark.parametrize("instance", small_instances())
+def test_cover_cuts_are_valid(instance):
+    c, A, b = instance
+    check_cuts(A, b, separation_rounds(lambda lp, x: cover_cuts(lp.A, lp.b, x), c, A, b))
+
+def test_cover_cuts_are_found():
+    found = [separation_rounds(lambda lp, x: cover_cuts(lp.A, lp.b, x), *random_instance(seed)) for seed in RANDOM_SEEDS]
+    assert sum(len(rounds) > 0 for rounds in found) > len(RANDOM_SEEDS) // 2
+
+def test_cover_lifting():
+    # 4 x0 + 4 x1 + 4 x2 + 8 x3 + 3 x4 <= 11 at x = (1, 1, 3/4, 0, 0): the greedy cover is {x0, x1, x2}
+    # (weight 12, minimal), the cover weights give mu = (4, 8, 12), so x3 (8 >= mu_2) gets 2 and
+    # x4 (3 < mu_1) gets 0: x0 + x1 + x2 + 2 x3 <= 2, which is also the sequentially lifted inequality
+    A = np.array([[4.0, 4.0, 4.0, 8.0, 3.0]])
+    b = np.array([11.0])
+    x = np.array([1.0, 1.0, 0.75, 0.0, 0.0])
+    cuts, limits = cover_cuts(A, b, x)
+    assert len(limits) == 1
+    assert np.allclose(cuts[0], [1.0, 1.0, 1.0, 2.0, 0.0]) and limits[0] == 2.0
+    assert cuts[0] @ x - limits[0] == pytest.approx(0.75)
+    assert np.all(feasible_points(A, b) @ cuts[0] <= limits[0])
+
+def test_cover_skips_rows_with_negative_coefficients():
+    # Without the last column {x0, x1} would be a violated cover
+    A = np.array([[4.0, 4.0, 4.0, -4.0]])
+    b = np.array([6.0])
+    x = np.array([1.0, 0.5, 0.0, 0.0])
+    assert len(cover_cuts(A[:, :3], b, x[:3])[1]) == 1
+    assert len(cover_cuts(A, b, x)[1]) == 0
+
+def gmi_separate(lp, x):
+    return GomorySeparator(1e-6, {"formula": "gmi"}).separate(lp, x)
+
+@pytest.mark.parametrize("instance", small_instances())
+def test_gmi_cuts_are_valid(instance):
+    c, A, b = instance
+    check_cuts(A, b, separation_rounds(gmi_separate, c, A, b))
+
+@pytest.mark.parametrize("path", SMALL_INSTANCES, ids=os.path.basename)
+def test_complemented_tableau_gives_the_basic_values(path):
+    c, A, b = getProblemData(path)
+    lp = NumpyBackend("test")
+    lp.build(c, A, b)
+    # The start basis has every x_j at its upper bound (c_j > 0): no pivot yet
+    status = lp.basis_status()
+    assert np.all(status[:len(c)] == AT_UPPER)
+    lp.solve()
+    tableau = lp.tableau().complemented(len(c))
+    basic = np.nonzero(tableau.status == BASIC)[0]
+    head = basic[np.argmax(np.abs(tableau.BinvA[:, basic]), axis=1)]
+    assert np.allclose(tableau.b_bar, lp.values()[head])
+    assert np.array_equal(tableau.integer_rows, head < len(c))
+    lp.close()
+
+def test_gmi_cuts_with_variables_at_upper_bound():
+    # Some nonbasic variables are at their upper bound at the optimum of these instances: every GMI
+    # cut must still cut off the LP optimum, while the fractional cuts of the raw rows can miss it
+    at_upper, fractional_missed = 0, 0
+    for path in SMALL_INSTANCES:
+        c, A, b = getProblemData(path)
+        lp = NumpyBackend("test")
+        lp.build(c, A, b)
+        lp.solve()
+        x = lp.values()[:len(c)]
+        if np.any(lp.basis_status()[:len(c)] == AT_UPPER):
+            at_upper += 1
+            cuts, limits = GomorySeparator(1e-6, {"formula": "gmi"}).separate(lp, x)
+            assert len(limits) > 0
+            assert np.all(cuts @ x > limits + 1e-9)
+            assert np.all(feasible_points(A, b) @ cuts.T <= limits + 1e-7)
+            cuts, limits = GomorySeparator(1e-6, {"formula": "fractional"}).separate(lp, x)
+            fractional_missed += np.count_nonzero(cuts @ x <= limits + 1e-9)
+        lp.close()
+    assert at_upper > 0
+    assert fractional_missed > 0
+
+@pytest.mark.parametrize("aggregate_cuts", [False, True], ids=["model_rows", "aggregate_cuts"])
+@pytest.mark.parametrize("instance", small_instances())
+def test_mir_cuts_are_valid(instance, aggregate_cuts):
+    # The GMI cuts of every round are added too, so that MIR_AGGREGATE_CUTS = yes aggregates them
+    c, A, b = instance
+    mir = MIRSeparator(aggregate_cuts=aggregate_cuts)
+    def separate(lp, x):
+        cuts, limits = mir.separate(lp, x)
+        gmi_cuts, gmi_limits = gmi_separate(lp, x)
+        return np.vstack((cuts, gmi_cuts)), np.concatenate((limits, gmi_limits))
+    check_cuts(A, b, separation_rounds(separate, c, A, b, rounds=4))
+
+def test_mir_cuts_are_found():
+    found = 0
+    for seed in RANDOM_SEEDS:
+        c, A, b = random_instance(seed)
+        lp = NumpyBackend("test")
+        lp.build(c, A, b)
+        lp.solve()
+        found += len(mir_cuts(lp.A, lp.b, lp.values()[:len(c)])[1]) > 0
+        lp.close()
+    assert found > len(RANDOM_SEEDS) // 2
+
+def test_mir_rounding():
+    # 3 x0 + 3 x1 <= 4 at x = (1, 1/3): x0 is complemented, delta = 3 gives -(1-x0) + x1 <= 1/3,
+    # rounded to -(1-x0) + x1 <= 0, i.e. x0 + x1 <= 1 (violated by 1/3), in the units of the row
+    A = np.array([[3.0, 3.0]])
+    b = np.array([4.0])
+    x = np.array([1.0, 1.0/3])
+    cuts, limits = mir_cuts(A, b, x)
+    assert len(limits) == 1
+    assert np.allclose(cuts[0] / limits[0], [1.0, 1.0])
+    assert (cuts[0] @ x - limits[0]) / limits[0] == pytest.approx(1.0/3)